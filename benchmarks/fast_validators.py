@@ -0,0 +1,125 @@
+"""
+Differential check of the generated validators against marshmallow on random flat payloads,
+then the time per call of both.
+
+    python -m benchmarks.fast_validators [--cases 20000] [--number 20000] [--seed 0]
+"""
+import argparse
+import enum
+import random
+import timeit
+
+from marshmallow import EXCLUDE, INCLUDE, RAISE
+from marshmallow import Schema
+from marshmallow import ValidationError
+from marshmallow import fields
+from marshmallow import validate
+
+from flasgger_marshmallow.fast_validators import compile_schema
+from flasgger_marshmallow.fast_validators import fast_data_schema
+from flasgger_marshmallow.utils import data_schema
+
+
+class Color(enum.Enum):
+    red = 1
+    blue = 2
+
+
+class PathSchema(Schema):
+    username = fields.String(required=True)
+    id = fields.Integer(required=True, validate=validate.Range(min=1))
+
+
+class QuerySchema(Schema):
+    page = fields.Integer(load_default=1)
+    size = fields.Integer(required=False, validate=validate.Range(max=100))
+    ratio = fields.Float(required=False, allow_none=True)
+    active = fields.Boolean(required=False)
+    order = fields.String(required=False, validate=validate.OneOf(['asc', 'desc']))
+    color = fields.Enum(Color, required=False)
+    name = fields.String(attribute='username', required=False)
+
+    class Meta:
+        unknown = EXCLUDE
+
+
+class HeadersSchema(Schema):
+    credential = fields.String(required=True, data_key='Login-Credential')
+    agent = fields.String(data_key='User-Agent', load_default=lambda: 'unknown')
+
+    class Meta:
+        unknown = INCLUDE
+
+
+class StrictSchema(Schema):
+    flag = fields.Bool(required=True, allow_none=True)
+    count = fields.Int(required=False, strict=True)
+    code = fields.Str(required=False, dump_only=True)
+
+    class Meta:
+        unknown = RAISE
+
+
+SCHEMAS = (PathSchema, QuerySchema, HeadersSchema, StrictSchema)
+
+VALUES = (
+    None, '', 'x', 'asc', 'desc', 'red', 'blue', 'true', 'False', 'on', '0', '1', '-3', '1.5', '1e3', 'nan',
+    0, 1, -1, 7, 1000, 1.5, float('inf'), True, False, 2 ** 70, [], {}, ['1'], b'1',
+)
+
+
+def random_payload(schema, rng):
+    keys = [
+        field.data_key if field.data_key is not None else name
+        for name, field in schema.fields.items()
+    ] + ['extra', 'Accept']
+    payload = {key: rng.choice(VALUES) for key in keys if rng.random() < 0.6}
+    return rng.choice((payload, payload, payload, None, [payload], 'x'))
+
+
+def outcome(function, data):
+    try:
+        return 'ok', function(data)
+    except ValidationError as error:
+        return 'error', error.messages, error.valid_data
+
+
+def check(cases, seed):
+    rng = random.Random(seed)
+    for schema_class in SCHEMAS:
+        schema = schema_class()
+        compiled = compile_schema(schema)
+        assert compiled is not None, '%s is not compiled' % schema_class.__name__
+        for _ in range(cases):
+            data = random_payload(schema, rng)
+            for load_only in (False, True):
+                expected = outcome(lambda d: data_schema(schema, d, load_only), data)
+                result = outcome(lambda d: fast_data_schema(compiled, d, load_only), data)
+                if repr(result) != repr(expected):
+                    raise AssertionError('%s differs on %r:\n  marshmallow %r\n  generated   %r' % (
+                        schema_class.__name__, data, expected, result))
+        print('%-14s %d payloads identical' % (schema_class.__name__, cases))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--cases', type=int, default=20000)
+    parser.add_argument('--number', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    check(args.cases, args.seed)
+
+    schema = QuerySchema()
+    compiled = compile_schema(schema)
+    data = {'page': '2', 'size': '20', 'order': 'asc', 'active': 'true', 'color': 'red'}
+    for name, case in (
+        ('marshmallow', lambda: data_schema(schema, data)),
+        ('generated', lambda: fast_data_schema(compiled, data)),
+    ):
+        best = min(timeit.repeat(case, number=args.number, repeat=3))
+        print('%-12s %8.2f us' % (name, best / args.number * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+CPU spent by data_schema on a large nested json body, with and without the dump round-trip.
+
+    python -m benchmarks.load_only [--users 2000] [--repeat 5]
+"""
+import argparse
+import timeit
+
+from marshmallow import Schema
+from marshmallow import fields
+
+from flasgger_marshmallow.utils import data_schema
+from flasgger_marshmallow.utils import dump_schema
+
+
+class MobileSchema(Schema):
+    model = fields.String(required=True)
+    no = fields.String(required=True)
+
+
+class UserSchema(Schema):
+    username = fields.Str(required=True)
+    age = fields.Integer(required=False)
+    qq = fields.List(fields.String, required=False)
+    email = fields.Email(required=False)
+    mobile = fields.Nested(MobileSchema, many=False)
+
+
+class UsersSchema(Schema):
+    users = fields.Nested(UserSchema, many=True)
+    count = fields.Integer(required=True)
+
+
+def make_body(users):
+    return {
+        'count': users,
+        'users': [
+            {
+                'username': 'user%d' % i,
+                'age': i % 90,
+                'qq': [str(i), str(i + 1)],
+                'email': 'user%d@example.com' % i,
+                'mobile': {'model': 'phone', 'no': str(i)},
+            }
+            for i in range(users)
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    schema = UsersSchema()
+    body = make_body(args.users)
+    cases = (
+        ('load + dump', lambda: data_schema(schema, body)),
+        ('load only (requests)', lambda: data_schema(schema, body, load_only=True)),
+        ('dump only (responses)', lambda: dump_schema(schema, body)),
+    )
+    for name, case in cases:
+        best = min(timeit.repeat(case, number=1, repeat=args.repeat))
+        print('%-22s %8.2f ms' % (name, best * 1000))
+
+
+if __name__ == '__main__':
+    main()
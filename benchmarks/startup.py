@@ -0,0 +1,37 @@
+"""
+Startup cost of N synthetic endpoints: decoration time and first spec request,
+with the docs built eagerly for the YAML docstrings or lazily without them.
+
+    python -m benchmarks.startup [--endpoints 500] [--depth 3] [--width 8]
+"""
+import argparse
+import time
+
+from benchmarks.synthetic import make_app
+
+MODES = (
+    ('eager (yaml docstring)', {'yaml_doc': True}),
+    ('lazy', {'yaml_doc': False}),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--endpoints', type=int, default=500)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--width', type=int, default=8)
+    args = parser.parse_args()
+
+    print('%-24s %12s %14s' % ('mode', 'startup ms', 'first spec ms'))
+    for name, options in MODES:
+        start = time.perf_counter()
+        app = make_app(args.endpoints, args.depth, args.width, **options)
+        startup = time.perf_counter() - start
+        start = time.perf_counter()
+        app.test_client().get('/apispec_1.json')
+        first_spec = time.perf_counter() - start
+        print('%-24s %12.1f %14.1f' % (name, startup * 1000, first_spec * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""
+Benchmark suite of a synthetic app: decorator overhead per request, request and response
+validation throughput, cold and warm apispec build time and apispec size.
+Results are written as JSON; with --compare, exits with 1 when a metric regresses beyond
+--threshold (relative) against a previous results file.
+
+    python -m benchmarks.suite [--endpoints 100] [--depth 3] [--width 8] [--items 5]
+                               [--output results.json] [--compare baseline.json] [--threshold 0.1]
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import timeit
+from importlib.metadata import version
+
+from flask import request
+
+from benchmarks.synthetic import make_app
+from benchmarks.synthetic import make_payload
+from benchmarks.synthetic import make_schema
+from flasgger_marshmallow.utils import data_schema
+
+LOWER, HIGHER = 'lower', 'higher'
+
+
+def best(function, number, repeat):
+    """Best time per call of `function` in seconds"""
+    return min(timeit.repeat(function, number=number, repeat=repeat)) / number
+
+
+def measure_requests(args, payload):
+    """Seconds per request of a decorated endpoint and of the same view undecorated"""
+    app = make_app(1, args.depth, args.width)
+
+    @app.route('/plain', methods=['POST'])
+    def plain():
+        return request.get_json() or {}
+
+    client = app.test_client()
+    query = {'field_0': 'value', 'field_1': 42}
+    decorated = best(lambda: client.post('/endpoint_0', query_string=query, json=payload), args.number, args.repeat)
+    undecorated = best(lambda: client.post('/plain', query_string=query, json=payload), args.number, args.repeat)
+    return decorated, undecorated
+
+
+def measure_spec(args):
+    """(cold build seconds, warm build seconds, apispec bytes, gzipped bytes)"""
+    colds = []
+    for _ in range(args.repeat):
+        app = make_app(args.endpoints, args.depth, args.width, yaml_doc=False)
+        start = time.perf_counter()
+        app.test_client().get('/apispec_1.json')
+        colds.append(time.perf_counter() - start)
+    swag = app.swag
+
+    def warm():
+        swag.apispecs.clear()
+        swag.serialized_apispecs.clear()
+        return swag.get_serialized_apispecs('apispec_1')
+
+    with app.app_context():
+        warm_time = best(warm, 1, args.repeat)
+        serialized = warm()
+    return min(colds), warm_time, len(serialized.body), len(serialized.gzip_body)
+
+
+def run(args):
+    schema = make_schema(args.depth, args.width)()
+    payload = make_payload(args.depth, args.width, args.items)
+    decorated, undecorated = measure_requests(args, payload)
+    cold, warm, size, gzip_size = measure_spec(args)
+    metrics = {
+        'decorator_overhead_us': ((decorated - undecorated) * 1e6, 'us', LOWER),
+        'request_us': (decorated * 1e6, 'us', LOWER),
+        'request_validation_per_s': (
+            1 / best(lambda: data_schema(schema, payload, load_only=True), args.number, args.repeat), '/s', HIGHER),
+        'response_validation_per_s': (
+            1 / best(lambda: data_schema(schema, payload), args.number, args.repeat), '/s', HIGHER),
+        'spec_build_cold_ms': (cold * 1000, 'ms', LOWER),
+        'spec_build_warm_ms': (warm * 1000, 'ms', LOWER),
+        'spec_bytes': (size, 'B', LOWER),
+        'spec_gzip_bytes': (gzip_size, 'B', LOWER),
+    }
+    return {
+        'params': {
+            'endpoints': args.endpoints, 'depth': args.depth, 'width': args.width, 'items': args.items,
+            'number': args.number, 'repeat': args.repeat,
+        },
+        'environment': {
+            'python': platform.python_version(), 'flask': version('flask'), 'marshmallow': version('marshmallow'),
+        },
+        'metrics': {
+            name: {'value': value, 'unit': unit, 'better': better}
+            for name, (value, unit, better) in metrics.items()
+        },
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print the change of every metric against `baseline`, return the names of the regressed ones"""
+    regressions = []
+    if baseline.get('params') != results['params']:
+        print('warning: the baseline was run with other parameters %s' % baseline.get('params'))
+    print('%-26s %14s %14s %9s' % ('metric', 'baseline', 'current', 'change'))
+    for name, metric in results['metrics'].items():
+        base = baseline.get('metrics', {}).get(name)
+        if base is None or base['value'] <= 0:
+            continue
+        change = (metric['value'] - base['value']) / base['value']
+        regression = change if metric['better'] == LOWER else -change
+        regressed = regression > threshold
+        if regressed:
+            regressions.append(name)
+        print('%-26s %14.2f %14.2f %+8.1f%%%s' % (
+            name, base['value'], metric['value'], change * 100, '  REGRESSION' if regressed else ''))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--endpoints', type=int, default=100)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--width', type=int, default=8)
+    parser.add_argument('--items', type=int, default=5, help='children per nested many field of the payload')
+    parser.add_argument('--number', type=int, default=200, help='calls per timing')
+    parser.add_argument('--repeat', type=int, default=5, help='timings per measure, the best is kept')
+    parser.add_argument('--output', help='file the JSON results are written to')
+    parser.add_argument('--compare', help='results file of the baseline')
+    parser.add_argument('--threshold', type=float, default=0.1, help='relative regression failing the comparison')
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if not args.compare:
+        for name, metric in results['metrics'].items():
+            print('%-26s %14.2f %s' % (name, metric['value'], metric['unit']))
+        return
+    with open(args.compare) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print('%d metric(s) regressed beyond %.0f%%: %s' % (len(regressions), args.threshold * 100,
+                                                             ', '.join(regressions)))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Synthetic Flask apps: N endpoints validating schemas of configurable depth and width.
+"""
+from flask import Flask
+from flask import request
+from marshmallow import Schema
+from marshmallow import fields
+
+from flasgger_marshmallow import Swagger
+from flasgger_marshmallow import swagger_decorator
+
+SCALAR_FIELDS = (fields.String, fields.Integer, fields.Boolean)
+SCALAR_VALUES = ('value', 42, True)
+
+
+def make_schema(depth, width, name='Synthetic'):
+    """
+    A new schema class with `width` scalar fields and, while `depth` > 1,
+    a nested and a nested many child of depth - 1
+    """
+    attrs = {
+        'field_%d' % index: SCALAR_FIELDS[index % 3](required=index % 2 == 0)
+        for index in range(width)
+    }
+    if depth > 1:
+        child = make_schema(depth - 1, width, name + 'Child')
+        attrs['child'] = fields.Nested(child)
+        attrs['children'] = fields.Nested(child, many=True)
+    return type(name, (Schema,), attrs)
+
+
+def make_payload(depth, width, items=2):
+    """A valid payload of make_schema(depth, width), with `items` children per nested many field"""
+    payload = {'field_%d' % index: SCALAR_VALUES[index % 3] for index in range(width)}
+    if depth > 1:
+        payload['child'] = make_payload(depth - 1, width, items)
+        payload['children'] = [make_payload(depth - 1, width, items) for _ in range(items)]
+    return payload
+
+
+def make_query_schema(width, name='SyntheticQuery'):
+    return type(name, (Schema,), {
+        'field_%d' % index: SCALAR_FIELDS[index % 3]() for index in range(width)
+    })
+
+
+def make_view():
+    def view(**kwargs):
+        return request.json_schema or {}
+    return view
+
+
+def make_app(endpoints, depth=2, width=5, swagger_config=None, **options):
+    """
+    An app with `endpoints` POST routes `/endpoint_<i>` validating a query schema, a json body
+    and the response (echoing the body) with their own schema classes,
+    `options` are passed to swagger_decorator
+    """
+    app = Flask(__name__)
+    Swagger(app, config=swagger_config)
+    for index in range(endpoints):
+        body_schema = make_schema(depth, width, 'Body%d' % index)
+        decorator = swagger_decorator(
+            query_schema=make_query_schema(width, 'Query%d' % index),
+            json_schema=body_schema,
+            response_schema={200: body_schema},
+            **options
+        )
+        app.add_url_rule(
+            '/endpoint_%d' % index, 'endpoint_%d' % index, decorator(make_view()), methods=['POST'])
+    return app
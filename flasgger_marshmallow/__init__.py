@@ -1,4 +1,8 @@
 from .swagger_class import Swagger
-from .decorators import swagger_decorator
+from .cache import CacheBackend, LRUBackend, ResponseCache
+from .decorators import DECORATOR_DEFAULTS, RESPONSE_VALIDATION_FAILURES, swagger_decorator
+from .log_backend import QueueLogBackend
+from .metrics import HistogramMetrics, MetricsHook
 
-__all__ = ['Swagger', 'swagger_decorator']
+__all__ = ['Swagger', 'swagger_decorator', 'DECORATOR_DEFAULTS', 'RESPONSE_VALIDATION_FAILURES', 'QueueLogBackend',
+           'HistogramMetrics', 'MetricsHook', 'ResponseCache', 'CacheBackend', 'LRUBackend']
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import mmap
+import os
+
+from marshmallow import fields
+
+from .registry import find_registered
+from .registry import iter_rule_methods
+
+# bumped whenever the artifacts layout or the spec generation changes
+ARTIFACT_FORMAT_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+
+
+def schema_signature(schema, seen=None):
+    """
+    Cheap description of a schema and its nested schemas (fields, types, keys, docs),
+    without compiling it, to tell whether a prebuilt spec still matches the code
+    """
+    schema_class = schema if isinstance(schema, type) else type(schema)
+    name = '%s.%s' % (schema_class.__module__, schema_class.__qualname__)
+    seen = set() if seen is None else seen
+    if name in seen:
+        return name
+    seen.add(name)
+    signature = [name, schema_class.__doc__]
+    for attr, value in schema_class._declared_fields.items():
+        field_signature = [
+            attr, type(value).__name__, value.required,
+            getattr(value, 'data_key', None) or getattr(value, 'load_from', None),
+            repr(sorted(value.metadata.items())), repr(getattr(value, 'default', None)),
+        ]
+        if isinstance(value, fields.Nested):
+            nested = value.nested
+            if callable(nested) and not isinstance(nested, type):
+                nested = nested()
+            if isinstance(nested, str):
+                field_signature.append(nested)
+            else:
+                field_signature.append(schema_signature(nested, seen))
+            field_signature.append((value.many, repr(value.only), repr(value.exclude)))
+        signature.append(field_signature)
+    meta = getattr(schema_class, 'Meta', None)
+    if getattr(meta, 'headers', None):
+        signature.append(schema_signature(meta.headers, seen))
+    signature.append(repr(getattr(meta, 'produces', None)))
+    signature.append(repr(getattr(meta, 'xml_root', None)))
+    return signature
+
+
+def sources_signature(sources):
+    signature = []
+    for source in sources:
+        if isinstance(source, type):
+            signature.append(schema_signature(source))
+        elif isinstance(source, dict):
+            signature.append([(str(code), schema_signature(schema)) for code, schema in source.items()])
+        else:
+            signature.append(repr(source))
+    return signature
+
+
+def plain_config(config):
+    """
+    `config` without its callables (rule filters...), whose repr changes between processes,
+    and without the artifacts, cache and metrics settings, which do not change the spec
+    """
+    return {
+        key: value for key, value in config.items()
+        if not callable(value) and key != 'specs'
+        and not key.startswith(('apispec_artifacts', 'apispec_cache', 'metrics'))
+    }
+
+
+def apispec_fingerprint(swagger, spec):
+    """
+    Fingerprint of everything the apispec of `spec` is built from: config, rules, and
+    schemas or docstrings of the views. Call it within an app context.
+    """
+    ignore_verbs = set(swagger.config.get('ignore_verbs', ('HEAD', 'OPTIONS')))
+    parts = [
+        ARTIFACT_FORMAT_VERSION, plain_config(swagger.config), plain_config(spec), swagger.template,
+    ]
+    for rule in sorted(swagger.get_url_mappings(spec.get('rule_filter')), key=lambda rule: (rule.rule, rule.endpoint)):
+        parts.append([rule.rule, rule.endpoint, sorted(rule.methods)])
+        for verb, method in iter_rule_methods(rule, ignore_verbs):
+            registered = method is not None and find_registered(method)
+            if registered:
+                _, (_, doc, sources) = registered
+                parts.append([verb, doc, sources_signature(sources or ())])
+            else:
+                parts.append([verb, getattr(method, '__doc__', None), repr(getattr(method, 'specs_dict', None))])
+    encoded = json.dumps(parts, sort_keys=True, default=repr).encode('utf-8')
+    return hashlib.sha1(encoded).hexdigest()
+
+
+def write_artifacts(swagger, directory):
+    """
+    Build every configured apispec from the code, ignoring the artifacts already written,
+    and write `<endpoint>.json`, `<endpoint>.json.gz` and a manifest with their fingerprint
+    and ETag into `directory`. The manifest is written last and every file atomically, so an
+    interrupted run never leaves a manifest pointing at partial files. Return the written paths.
+    """
+    os.makedirs(directory, exist_ok=True)
+    manifest = {'format_version': ARTIFACT_FORMAT_VERSION, 'specs': {}}
+    written = []
+    built = swagger.build_serialized_apispecs()
+    for spec in swagger.config['specs']:
+        endpoint = spec['endpoint']
+        serialized = built[endpoint]
+        for suffix, body in (('.json', serialized.body), ('.json.gz', serialized.gzip_body)):
+            path = os.path.join(directory, endpoint + suffix)
+            write_atomic(path, body)
+            written.append(path)
+        manifest['specs'][endpoint] = {
+            'fingerprint': apispec_fingerprint(swagger, spec),
+            'etag': serialized.etag,
+        }
+    path = os.path.join(directory, MANIFEST_NAME)
+    write_atomic(path, json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    written.append(path)
+    return written
+
+
+def read_manifest(directory):
+    """The artifacts manifest, None when missing or of another format version"""
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+    except (IOError, ValueError):
+        return None
+    if manifest.get('format_version') != ARTIFACT_FORMAT_VERSION:
+        return None
+    return manifest
+
+
+def read_artifact(path, use_mmap=False):
+    with open(path, 'rb') as f:
+        if use_mmap:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return f.read()
+
+
+def cache_path(directory, endpoint, fingerprint):
+    return os.path.join(directory, '%s-%s.json' % (endpoint, fingerprint))
+
+
+def write_atomic(path, body):
+    """Write through a temporary file so that concurrent workers never read a partial file"""
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp_path, 'wb') as f:
+        f.write(body)
+    os.replace(tmp_path, path)
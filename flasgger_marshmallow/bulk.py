@@ -0,0 +1,59 @@
+from collections import namedtuple
+from collections.abc import Mapping
+from marshmallow import ValidationError
+
+from .utils import data_schema
+
+# the valid items of a bulk json body, in their order, and the messages of the others by index
+BulkResult = namedtuple('BulkResult', ['items', 'errors'])
+
+
+def load_chunk(schema, load_only, fail_fast, start, items):
+    """
+    Load the `items` of a bulk body starting at index `start` with one instance of `schema`,
+    returning (valid items, {index: messages}).
+    A module level function of a schema class, so that process pools can pickle it.
+    """
+    schema = schema()
+    valid, errors = [], {}
+    for index, item in enumerate(items, start):
+        if not isinstance(item, Mapping):
+            # data_schema would load a falsy item (0, "", []) as an empty object
+            errors[index] = {'_schema': ['Invalid input type.']}
+            if fail_fast:
+                break
+            continue
+        try:
+            valid.append(data_schema(schema, item, load_only))
+        except ValidationError as e:
+            errors[index] = e.messages
+            if fail_fast:
+                break
+    return valid, errors
+
+
+def bulk_load(schema, data, load_only=False, chunk_size=1000, executor=None, fail_fast=False):
+    """
+    Load the json array `data` by chunks of `chunk_size` items, in `executor` when given
+    (a process pool for the CPU bound schemas), into a BulkResult.
+    With `fail_fast`, raise a ValidationError of the first invalid chunk instead.
+    """
+    if not isinstance(data, list):
+        raise ValidationError({'_schema': ['Invalid input type.']})
+    chunks = [(start, data[start:start + chunk_size]) for start in range(0, len(data), chunk_size)]
+    if executor is None:
+        results = (load_chunk(schema, load_only, fail_fast, start, items) for start, items in chunks)
+    else:
+        futures = [executor.submit(load_chunk, schema, load_only, fail_fast, start, items) for start, items in chunks]
+        results = (future.result() for future in futures)
+
+    valid, errors = [], {}
+    for chunk_valid, chunk_errors in results:
+        if chunk_errors and fail_fast:
+            if executor is not None:
+                for future in futures:
+                    future.cancel()
+            raise ValidationError(chunk_errors)
+        valid.extend(chunk_valid)
+        errors.update(chunk_errors)
+    return BulkResult(valid, errors)
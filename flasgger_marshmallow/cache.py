@@ -0,0 +1,145 @@
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+
+# request methods whose responses are cached
+CACHED_METHODS = ('GET', 'HEAD')
+
+
+class CacheBackend(object):
+    """Storage of a ResponseCache; implementations must be thread safe"""
+
+    def get(self, key):
+        """The value stored under `key`, None when missing or expired"""
+        raise NotImplementedError
+
+    def set(self, key, value, ttl):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class LRUBackend(CacheBackend):
+    """In-process storage of up to `max_size` entries, the least recently used are evicted first"""
+
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        # key -> (expiry time, value), from the least to the most recently used
+        self.entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+
+def freeze(value):
+    """Hashable and order independent form of validated request data"""
+    if isinstance(value, Mapping):
+        return tuple(sorted((key, freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, set):
+        return frozenset(value)
+    return value
+
+
+def endpoint_name(endpoint):
+    """
+    The name of a view in the cache keys: its `module.qualname`, so that same-named views
+    of different modules sharing a cache don't read each other's entries
+    """
+    return endpoint if isinstance(endpoint, str) else '%s.%s' % (endpoint.__module__, endpoint.__qualname__)
+
+
+class ResponseCache(object):
+    """
+    Cache of the validated and serialized responses of the swagger_decorator views, set as their
+    `cache` option. The successful responses to GET requests are kept for `ttl` seconds under the
+    view, its validated request data and the values of the `vary_headers` request headers;
+    HEAD requests share the entries of GET. The cached (data, code, headers) is returned as is
+    by every hit, so views must not mutate the objects they returned (e.g. a module level dict
+    returned without a response schema dumping a copy of it).
+    """
+
+    def __init__(self, ttl=5, max_size=1024, backend=None, vary_headers=()):
+        self.ttl = ttl
+        self.backend = backend if backend is not None else LRUBackend(max_size)
+        self.vary_headers = tuple(vary_headers)
+        self.hits = 0
+        self.misses = 0
+        # endpoint -> generation, incremented to invalidate all its entries
+        self.generations = {}
+        self._lock = threading.Lock()
+
+    def make_key(self, endpoint, validated, headers=None, view_args=None):
+        """
+        Key of a request to `endpoint` by its validated data, as (request attribute, data) pairs,
+        its `headers` among the vary_headers and the keyword arguments of the view
+        """
+        endpoint = endpoint_name(endpoint)
+        headers = headers or {}
+        return (
+            endpoint, self.generations.get(endpoint, 0),
+            tuple(sorted((name, freeze(data)) for name, data in validated)),
+            tuple(headers.get(header) for header in self.vary_headers),
+            freeze(view_args or {}),
+        )
+
+    def get(self, key):
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def store(self, key, response):
+        """Keep `response`, a (data, code, headers) view result, when it is a success"""
+        if isinstance(response, tuple) and 200 <= response[1] < 300:
+            self.backend.set(key, response, self.ttl)
+
+    def invalidate(self, endpoint, headers=None, view_args=None, **validated):
+        """
+        Drop the cached response of `endpoint` (a view or its `module.qualname`) to the request with the
+        validated data of every declared location (and the same view arguments and vary headers),
+        e.g. invalidate(get_user, path_schema={'username': 'bob'}, view_args={'username': 'bob'}),
+        or all the responses of `endpoint` without data
+        """
+        if not validated:
+            endpoint = endpoint_name(endpoint)
+            with self._lock:
+                self.generations[endpoint] = self.generations.get(endpoint, 0) + 1
+            return
+        self.backend.delete(self.make_key(endpoint, validated.items(), headers, view_args))
+
+    def clear(self):
+        self.backend.clear()
@@ -0,0 +1,18 @@
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from .artifacts import write_artifacts
+
+
+@click.command('swagger-prebuild')
+@click.option('--output', '-o', default='apispecs', show_default=True,
+              help='Directory the apispec artifacts are written to.')
+@with_appcontext
+def prebuild_command(output):
+    """Build every configured apispec and write them as JSON artifacts."""
+    swagger = getattr(current_app, 'swag', None)
+    if swagger is None or not hasattr(swagger, 'build_serialized_apispecs'):
+        raise click.ClickException('the app has no flasgger_marshmallow Swagger')
+    for path in write_artifacts(swagger, output):
+        click.echo(path)
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+
+from .cache import freeze
+
+# request attributes whose validated data identify the coalesced requests
+COALESCED_LOCATIONS = ('path_schema', 'query_schema', 'headers_schema')
+
+
+class Call(object):
+    """A call in flight, whose outcome is shared with the identical calls waiting for it"""
+
+    __slots__ = ('event', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        # threading primitives, cooperative once gevent monkey patched them
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        # (event loop, future) of the coroutines waiting for the call, None once it finished
+        self.waiters = []
+
+    def outcome(self):
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class SingleFlight(object):
+    """
+    Run a single call at a time by key: the calls made with the key of a call in flight
+    wait for it and share its result (or exception) instead of running
+    """
+
+    def __init__(self):
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def join(self, key, waiter=None):
+        """
+        (call in flight of `key`, whether the caller leads it and must run it);
+        a following coroutine gives its (event loop, future) `waiter`, woken when the call finishes
+        """
+        with self._lock:
+            call = self.calls.get(key)
+            if call is not None:
+                if waiter is not None:
+                    call.waiters.append(waiter)
+                return call, False
+            call = self.calls[key] = Call()
+            return call, True
+
+    def finish(self, key, call, result=None, error=None):
+        with self._lock:
+            del self.calls[key]
+            call.result, call.error = result, error
+            waiters, call.waiters = call.waiters, None
+        call.event.set()
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(wake, future)
+            except RuntimeError:
+                # the loop of a cancelled request closed
+                pass
+
+    def do(self, key, function):
+        """(result of function() or of the identical call in flight, whether it is shared)"""
+        call, leader = self.join(key)
+        if not leader:
+            call.event.wait()
+            return call.outcome(), True
+        try:
+            result = function()
+        except BaseException as e:
+            self.finish(key, call, error=e)
+            raise
+        self.finish(key, call, result)
+        return result, False
+
+    async def do_async(self, key, function):
+        """do for a coroutine `function`, the followers await a future of their own event loop"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        call, leader = self.join(key, (loop, future))
+        if not leader:
+            await future
+            return call.outcome(), True
+        try:
+            result = await function()
+        except BaseException as e:
+            self.finish(key, call, error=e)
+            raise
+        self.finish(key, call, result)
+        return result, False
+
+
+def coalesce_key(validated, view_args):
+    """Key of a request by the validated data of its path, query and headers and the view arguments"""
+    return (
+        tuple(sorted((name, freeze(data)) for name, data in validated if name in COALESCED_LOCATIONS)),
+        freeze(view_args or {}),
+    )
@@ -1,214 +1,468 @@
-import copy
+import asyncio
+from collections import Counter
 from flask import request
 import logging
 import functools
+import inspect
+import random
+import threading
 import yaml
-from marshmallow import fields
-from marshmallow.utils import _Missing
-from .utils import FIELDS_JSON_TYPE_MAP, PYTHON_TYPE_JSON_TYPE_MAP, is_marsh_v3, data_schema, unpack
+from werkzeug.exceptions import HTTPException
+from .bulk import BulkResult, bulk_load
+from .cache import CACHED_METHODS, endpoint_name
+from .coalesce import SingleFlight, coalesce_key
+from .fast_validators import compile_schema, fast_data_schema
+from .limits import RequestLimitError, limited_form_extractor, limited_json_extractor, schema_depth
+from .metrics import async_timed, timed, timed_validator
+from .registry import register_spec
+from .spec import generate_doc
+from .streaming import build_stream_plan, stream_response
+from .utils import (
+    MARSHMALLOW_V3, LazyLogFormat, data_schema, dump_schema, format_messages, schema_instance_getter, unpack)
+
+if MARSHMALLOW_V3:
+    from marshmallow import EXCLUDE
 
 logger = logging.getLogger(__name__)
 
+# process wide defaults of the swagger_decorator options left to None,
+# read when an endpoint is decorated
+DECORATOR_DEFAULTS = {
+    # return the loaded request data without dumping it again,
+    # and only dump (no validation) the responses
+    'load_only': False,
+    # also dump the spec as YAML into the view docstring, for flasgger's own Swagger class
+    'yaml_doc': True,
+    # document nested schemas once under `definitions` and reference them with `$ref`
+    'nested_refs': True,
+    # QueueLogBackend writing the payload logs off the request thread, None to log inline
+    'log_backend': None,
+    # validation of the responses: 'always', 'never' (dump only) or 'sampled',
+    # None for 'never' with load_only and 'always' otherwise
+    'response_validation': None,
+    # share of the responses validated in 'sampled' mode
+    'response_sample_rate': 0.01,
+    # load and dump the flat request schemas (marshmallow 3) with generated functions
+    'fast_validators': True,
+    # concurrent.futures executor validating the requests of the `async def` views
+    # off the event loop, None to validate them on the loop
+    'validation_executor': None,
+    # items of a bulk json body loaded together
+    'bulk_chunk_size': 1000,
+    # concurrent.futures executor loading the chunks of the bulk bodies, None to load them inline
+    'bulk_executor': None,
+    # reject a bulk body on its first invalid chunk instead of passing the valid items to the view
+    'bulk_fail_fast': False,
+    # MetricsHook (e.g. HistogramMetrics) receiving the phase durations and the error counts,
+    # None to measure nothing
+    'metrics': None,
+    # json and form bodies over this size are answered 413 before being read, None for no limit
+    'max_body_bytes': None,
+    # json bodies with a longer array are answered 400 before being parsed, None for no limit
+    'max_array_length': None,
+    # json bodies nested deeper are answered 400 before being parsed, None for no limit
+    # or 'schema' for the depth of the json_schema Nested tree (no limit when it is unbounded)
+    'max_json_depth': None,
+}
+
+RESPONSE_VALIDATION_MODES = ('always', 'never', 'sampled')
+
+# view `module.qualname` -> count of the responses failing their validation in 'sampled' mode
+RESPONSE_VALIDATION_FAILURES = Counter()
+_failures_lock = threading.Lock()
+
+# request attribute, extractor of the raw data; in validation order
+REQUEST_LOCATIONS = (
+    ('path_schema', lambda: request.view_args),
+    ('query_schema', lambda: request.args),
+    ('form_schema', lambda: request.form),
+    ('json_schema', lambda: request.get_json(silent=True) or {}),
+    ('headers_schema', lambda: dict(request.headers)),
+)
+
+# request attribute, source of the locations whose declared keys can be read one by one
+KEYED_LOCATIONS = {
+    'query_schema': lambda: request.args,
+    # case insensitive lookups
+    'headers_schema': lambda: request.headers,
+}
+
+# request attribute, label in the request log
+LOG_LABELS = {
+    'path_schema': 'path params', 'query_schema': 'query params', 'form_schema': 'form params',
+    'json_schema': 'json params', 'headers_schema': 'headers',
+}
+
+
+class NoAliasDumper(yaml.Dumper):
+    """The compiled schema fragments are shared, dump them again instead of as YAML aliases"""
+
+    def ignore_aliases(self, data):
+        return True
+
+
+def build_validator(schema, load_only, fast_validators):
+    """Callable loading (and dumping again unless `load_only`) the data of a request location"""
+    get_schema = schema_instance_getter(schema)
+    compiled = fast_validators and compile_schema(get_schema())
+    if compiled:
+        return functools.partial(fast_data_schema, compiled, load_only=load_only)
+    return lambda data: data_schema(get_schema(), data, load_only)
+
+
+def declared_keys(schema):
+    """
+    Keys of the input data read by the `schema` instance,
+    None when it also reads or rejects the others (unknown INCLUDE or RAISE)
+    """
+    if MARSHMALLOW_V3:
+        if schema.unknown != EXCLUDE:
+            return None
+        return tuple(
+            field.data_key if field.data_key is not None else name
+            for name, field in schema.load_fields.items()
+        )
+    # marshmallow 2 ignores the unknown keys
+    keys = []
+    for name, field in schema.fields.items():
+        keys.append(name)
+        if field.load_from:
+            keys.append(field.load_from)
+    return tuple(keys)
+
+
+def keyed_extractor(source, keys):
+    """Extractor of the `keys` of the request `source` only, instead of a copy of all of them"""
+    def extract():
+        data = source()
+        return {key: data[key] for key in keys if key in data}
+
+    return extract
+
+
+def build_request_plan(schemas, load_only=False, fast_validators=False, bulk_options=None, limits=None):
+    """
+    Steps run on every request: (request attribute, extractor, validator)
+    for the declared locations only.
+    With `bulk_options`, the keyword arguments of bulk_load, the json body is an array loaded by chunks.
+    With `limits`, the keyword arguments of limited_json_extractor, the bodies are checked before being read.
+    """
+    plan = []
+    for name, extractor in REQUEST_LOCATIONS:
+        if not schemas.get(name):
+            continue
+        if name == 'json_schema' and bulk_options is not None:
+            extractor = (
+                limited_json_extractor(default=None, **limits) if limits is not None
+                else lambda: request.get_json(silent=True))
+            plan.append((
+                name, extractor,
+                functools.partial(bulk_load, schemas[name], load_only=load_only, **bulk_options)))
+        else:
+            if name in KEYED_LOCATIONS:
+                keys = declared_keys(schemas[name]())
+                if keys is not None:
+                    extractor = keyed_extractor(KEYED_LOCATIONS[name], keys)
+            elif name == 'json_schema' and limits is not None:
+                extractor = limited_json_extractor(default={}, **limits)
+            elif name == 'form_schema' and limits is not None and limits['max_body_bytes'] is not None:
+                extractor = limited_form_extractor(limits['max_body_bytes'])
+            plan.append((name, extractor, build_validator(schemas[name], load_only, fast_validators)))
+    return tuple(plan)
+
+
+def build_response_plan(response_schema):
+    """
+    Map every response code to (body schema getter, headers schema getter or None).
+    """
+    plan = {}
+    for code, current_schema in (response_schema or {}).items():
+        r_headers_schema = getattr(current_schema.Meta, 'headers', None)
+        plan[code] = (
+            schema_instance_getter(current_schema),
+            r_headers_schema and schema_instance_getter(r_headers_schema),
+        )
+    return plan
+
+
+def serialize_response(get_schema, get_headers_schema, data, headers, validate):
+    """Dump the response body and headers, loading them first to validate them when `validate`"""
+    serialize = data_schema if validate else dump_schema
+    data = serialize(get_schema(), data)
+    if get_headers_schema:
+        headers = serialize(get_headers_schema(), headers)
+    return data, headers
+
+
+def record_response_failure(endpoint, error):
+    with _failures_lock:
+        RESPONSE_VALIDATION_FAILURES[endpoint] += 1
+    logger.warning('response validation of %s failed: %s', endpoint, getattr(error, 'messages', error))
+
 
 def swagger_decorator(
     path_schema=None, query_schema=None,
     form_schema=None, json_schema=None,
     headers_schema=None, response_schema=None,
-    tags=None, max_length_log=None
+    tags=None, max_length_log=None, load_only=None, log_backend=None,
+    yaml_doc=None, nested_refs=None,
+    response_validation=None, response_sample_rate=None, fast_validators=None,
+    stream_field=None, validation_executor=None,
+    bulk=False, bulk_chunk_size=None, bulk_executor=None, bulk_fail_fast=None,
+    metrics=None, max_body_bytes=None, max_array_length=None, max_json_depth=None,
+    cache=None, coalesce=False
 ):
-    def decorator(func):
+    if load_only is None:
+        load_only = DECORATOR_DEFAULTS['load_only']
+    if log_backend is None:
+        log_backend = DECORATOR_DEFAULTS['log_backend']
+    if yaml_doc is None:
+        yaml_doc = DECORATOR_DEFAULTS['yaml_doc']
+    if nested_refs is None:
+        nested_refs = DECORATOR_DEFAULTS['nested_refs']
+    if response_validation is None:
+        response_validation = DECORATOR_DEFAULTS['response_validation']
+    if response_validation is None:
+        response_validation = 'never' if load_only else 'always'
+    if response_validation not in RESPONSE_VALIDATION_MODES:
+        raise ValueError('response_validation must be one of %s' % ', '.join(RESPONSE_VALIDATION_MODES))
+    if response_sample_rate is None:
+        response_sample_rate = DECORATOR_DEFAULTS['response_sample_rate']
+    sampled = response_validation == 'sampled'
+    if fast_validators is None:
+        fast_validators = DECORATOR_DEFAULTS['fast_validators']
+    if validation_executor is None:
+        validation_executor = DECORATOR_DEFAULTS['validation_executor']
+    bulk_options = None
+    if bulk:
+        bulk_options = {
+            'chunk_size': bulk_chunk_size or DECORATOR_DEFAULTS['bulk_chunk_size'],
+            'executor': bulk_executor or DECORATOR_DEFAULTS['bulk_executor'],
+            'fail_fast': DECORATOR_DEFAULTS['bulk_fail_fast'] if bulk_fail_fast is None else bulk_fail_fast,
+        }
+    if metrics is None:
+        metrics = DECORATOR_DEFAULTS['metrics']
+    if max_body_bytes is None:
+        max_body_bytes = DECORATOR_DEFAULTS['max_body_bytes']
+    if max_array_length is None:
+        max_array_length = DECORATOR_DEFAULTS['max_array_length']
+    if max_json_depth is None:
+        max_json_depth = DECORATOR_DEFAULTS['max_json_depth']
+    if max_json_depth == 'schema':
+        max_json_depth = schema_depth(json_schema) if json_schema else None
+        if max_json_depth is not None and bulk:
+            max_json_depth += 1
+    limits = None
+    if max_body_bytes is not None or max_array_length is not None or max_json_depth is not None:
+        limits = {'max_body_bytes': max_body_bytes, 'max_array_length': max_array_length, 'max_depth': max_json_depth}
 
-        def limit_log_length(content):
-            current_content = copy.deepcopy(content)
-            if max_length_log and len(current_content.__str__()) > max_length_log:
-                current_content = current_content.__str__()
-                return "%s...%s" % (
-                    current_content[:int(max_length_log / 2)], current_content[-int(max_length_log / 2):])
-            return current_content
+    def decorator(func):
 
         def log_format(content):
-            content = limit_log_length(content)
-            return content
-
-        def parse_simple_schema(c_schema, location):
-            ret = []
-            for key, value in c_schema.__dict__.get('_declared_fields').items():
-                values_real_types = list(set(FIELDS_JSON_TYPE_MAP) & set(value.__class__.__mro__))
-                values_real_types.sort(key=value.__class__.__mro__.index)
-                type_field = f'unsupported type {str(type(value))} (simple schema)'
-                if values_real_types:
-                    type_field = FIELDS_JSON_TYPE_MAP.get(values_real_types[0])
-                if is_marsh_v3():
-                    name = getattr(value, 'data_key', None) or key
-                else:
-                    name = getattr(value, 'load_from', None) or key
-                tmp = {
-                    'in': location,
-                    'name': name,
-                    'type': type_field,
-                    'required': value.required if location != 'path' else True,
-                    'description': value.metadata.get('doc', '')
-                }
-                if not isinstance(value.default, _Missing):
-                    tmp['default'] = value.default
-                ret.append(tmp)
-            return ret
-
-        def parse_json_schema(r_s):
-            tmp = {}
-            only = r_s.__dict__.get('only')
-            for key, value in (r_s.__dict__.get('_declared_fields') or r_s.__dict__.get('declared_fields') or {}).items():
-                if is_marsh_v3():
-                    key = getattr(value, 'data_key', None) or key
-                else:
-                    key = getattr(value, 'load_from', None) or key
-                if only and key not in only:
-                    continue
-                tmp[key] = {
-                    'description': value.metadata.get('doc', '')
-                }
-                current = tmp[key]
-                if isinstance(value, fields.Nested):
-                    if value.many:
-                        current['type'] = 'array'
-                        current['items'] = {
-                            'type': 'object',
-                            'properties': parse_json_schema(value.schema),
-                        }
-                        continue
-
-                    current['type'] = 'object'
-                    current['properties'] = parse_json_schema(value.schema)
-                    continue
-
-                if isinstance(value, fields.List):
-                    current['type'] = 'array'
-                    current['items'] = {
-                        'type': 'string',
-                    }
-                    if not isinstance(value.default, _Missing):
-                        current['default'] = value.default
-                    continue
-
-                if value.metadata.get('type'):
-                    current['type'] = PYTHON_TYPE_JSON_TYPE_MAP[value.metadata.get('type').__name__]
-                    current['required'] = value.required
-                    continue
-
-                values_real_types = list(set(FIELDS_JSON_TYPE_MAP) & set(value.__class__.__mro__))
-                values_real_types.sort(key=value.__class__.__mro__.index)
-                if values_real_types:
-                    current['type'] = FIELDS_JSON_TYPE_MAP.get(values_real_types[0])
-                    current['required'] = value.required
-                    continue
-
-                current['default'] = value.default
-
-            return tmp
-
-        def parse_request_body_json_schema(c_schema):
-            tmp = {
-                'in': 'body',
-                'name': 'body',
-                'required': True,
-                'description': 'json type of body',
-                'schema': {
-                    'properties': parse_json_schema(c_schema),
-                    'type': 'object',
-                }
-            }
-            return [tmp]
-
-        def generate_doc():
-            doc_dict = {}
-            if path_schema or query_schema or form_schema or json_schema or headers_schema:
-                doc_dict['parameters'] = []
-            if path_schema:
-                doc_dict['parameters'].extend(parse_simple_schema(path_schema, 'path'))
-            if query_schema:
-                doc_dict['parameters'].extend(parse_simple_schema(query_schema, 'query'))
-            if form_schema:
-                doc_dict['parameters'].extend(parse_simple_schema(form_schema, 'formData'))
-            if headers_schema:
-                doc_dict['parameters'].extend(parse_simple_schema(headers_schema, 'header'))
-            if json_schema:
-                doc_dict['parameters'].extend(parse_request_body_json_schema(json_schema))
-            if response_schema:
-                doc_dict['responses'] = {}
-                for code, current_schema in response_schema.items():
-                    current = parse_json_schema(current_schema)
-                    # print(code, current)
-                    # if current.type == 'unsupported type':
-                    #     print('unsupported type')
-                    #     continue
-                    doc_dict['responses'][code] = {
-                        'description': current_schema.__doc__,
-                        'schema': {
-                            'type': 'object',
-                            "properties": current,
-                        },
-                    }
-                    if not doc_dict['responses'][code].get('schema', {}).get('properties'):
-                        doc_dict['responses'][code].update({'schema': None})
-                    if getattr(current_schema.Meta, 'headers', None):
-                        doc_dict['responses'][code].update(
-                            {'headers': parse_json_schema(current_schema.Meta.headers)}
-                        )
-                    produces = getattr(current_schema.Meta, 'produces', None)
-                    if produces:
-                        doc_dict.setdefault('produces', [])
-                        doc_dict['produces'].extend(produces)
-                        ('application/xml' in produces and doc_dict['responses'][code]['schema'] and doc_dict
-                            ['responses'][code]['schema']
-                            .update({'xml': {'name': getattr(current_schema.Meta, 'xml_root', 'xml')}}))
-
-            if tags:
-                doc_dict['tags'] = tags
-
-            ret_doc = """---\n""" + yaml.dump(doc_dict)
-            return ret_doc
-
-        func.__doc__ = (func.__doc__.strip() + generate_doc()) if func.__doc__ else generate_doc()
-
-        @functools.wraps(func)
-        def wrapper(*args, **kw):
-            path_params = request.view_args
-            query_params = request.args
-            form_params = request.form
-            json_params = request.get_json(silent=True) or {}
-            header_params = request.headers
-            logger.info(
-                'request params\npath params: %s\nquery params: %s\nform params: %s\njson params: %s\n',
-                log_format(path_params), log_format(query_params), log_format(form_params), log_format(json_params)
+            return LazyLogFormat(content, max_length_log)
+
+        view_doc = func.__doc__
+        doc_sources = (
+            path_schema, query_schema, form_schema, json_schema, headers_schema,
+            response_schema, tags, nested_refs, bulk)
+        # without the YAML docstring, the spec is only built when the apispec is first requested
+        doc_dict = functools.partial(generate_doc, *doc_sources)
+        if yaml_doc:
+            doc_dict = doc_dict()
+            ret_doc = """---\n""" + yaml.dump(doc_dict, Dumper=NoAliasDumper)
+            func.__doc__ = (func.__doc__.strip() + ret_doc) if func.__doc__ else ret_doc
+
+        request_plan = build_request_plan({
+            'path_schema': path_schema, 'query_schema': query_schema,
+            'form_schema': form_schema, 'json_schema': json_schema,
+            'headers_schema': headers_schema,
+        }, load_only, fast_validators, bulk_options, limits)
+        # the name of the view in the metrics, the log rate limits, the failure counts and the cache
+        endpoint = endpoint_name(func)
+        request_log_format = 'request params\n' + ''.join(
+            '%s: %%s\n' % LOG_LABELS[name] for name, _, _ in request_plan)
+        if metrics is not None:
+            request_plan = tuple(
+                (name, extractor, timed_validator(metrics, endpoint, name, validate))
+                for name, extractor, validate in request_plan
             )
-            logger.info('headers: %s\n', header_params)
-            request.path_schema, request.path_schema, request.form_schema = [None] * 3
-            request.json_schema, request.headers_schema = [None] * 2
-            try:
-                path_schema and setattr(request, 'path_schema', data_schema(path_schema, path_params))
-                query_schema and setattr(request, 'query_schema', data_schema(query_schema, query_params))
-                form_schema and setattr(request, 'form_schema', data_schema(form_schema, form_params))
-                json_schema and setattr(request, 'json_schema', data_schema(json_schema, json_params))
-                headers_schema and setattr(request, 'headers_schema', data_schema(headers_schema, dict(header_params)))
-            except Exception as e:
-                if not hasattr(e, 'messages'):
-                    return 'request error: %s' % e, 400
-                return 'request error: %s' % ''.join(
-                    [('%s: %s; ' % (x, ''.join(y))) for x, y in e.messages.items()]), 400
-            f_result = func(*args, **kw)
+        response_plan = build_response_plan(response_schema)
+        stream_plan = build_stream_plan(response_schema, stream_field) if stream_field else {}
+        on_response_failure = functools.partial(record_response_failure, endpoint)
+        if sampled:
+            def validate_response():
+                return random.random() < response_sample_rate
+        else:
+            always = response_validation == 'always'
+
+            def validate_response():
+                return always
+        if log_backend is not None:
+            log_enabled = log_backend.is_enabled
+            log_info = functools.partial(log_backend.log, endpoint)
+        else:
+            log_enabled = functools.partial(logger.isEnabledFor, logging.INFO)
+            log_info = logger.info
+
+        def extract_request():
+            """Read, then log, the raw data of the declared locations only"""
+            for name, _ in REQUEST_LOCATIONS:
+                setattr(request, name, None)
+            request.json_errors = None
+            extracted = [(name, validate, extractor()) for name, extractor, validate in request_plan]
+            if log_enabled():
+                log_info(request_log_format, *[log_format(data) for _, _, data in extracted])
+            return extracted
+
+        def validate_request(extracted):
+            """Load the extracted data, touching neither the request nor its context"""
+            validated = []
+            for name, validate, data in extracted:
+                value = validate(data)
+                if type(value) is BulkResult:
+                    validated.append(('json_errors', value.errors))
+                    value = value.items
+                validated.append((name, value))
+            return validated
+
+        def request_error(e):
+            if isinstance(e, RequestLimitError):
+                # the validation errors are counted by their timed_validator
+                if metrics is not None:
+                    metrics.count_error(endpoint, e.location)
+                return 'request error: %s' % e, e.status
+            if not hasattr(e, 'messages'):
+                return 'request error: %s' % e, 400
+            return 'request error: %s' % format_messages(e.messages), 400
+
+        def response_error(e):
+            if metrics is not None:
+                metrics.count_error(endpoint, 'response')
+            if not hasattr(e, 'messages'):
+                # a dump failure, e.g. a value of the wrong type
+                return 'response error: %s' % e, 400
+            return 'response error: %s' % format_messages(e.messages), 400
+
+        def make_response(f_result):
             data, code, headers = unpack(f_result)
-            logger.info('response data\ndata: %s\ncode: %s\nheaders: %s\n', log_format(data), code, headers)
-            try:
-                if response_schema and response_schema.get(code):
-                    data = data_schema(response_schema.get(code), data)
-                    r_headers_schema = getattr(response_schema.get(code).Meta, 'headers', None)
-                    if r_headers_schema:
-                        headers = data_schema(r_headers_schema, headers)
-            except Exception as e:
-                return 'response error: %s' % ''.join(
-                    [('%s: %s; ' % (x, ''.join(y))) for x, y in e.messages.items()]), 400
+            if log_enabled():
+                log_info('response data\ndata: %s\ncode: %s\nheaders: %s\n', log_format(data), code, headers)
+            if code in stream_plan:
+                try:
+                    return stream_response(
+                        stream_plan[code], data, code, headers, validate_response, sampled, on_response_failure)
+                except Exception as e:
+                    return response_error(e)
+            if code in response_plan:
+                validate = validate_response()
+                try:
+                    data, headers = serialize_response(*response_plan[code], data, headers, validate)
+                except Exception as e:
+                    if not (sampled and validate):
+                        return response_error(e)
+                    # a sampled failure is reported, the response is still returned
+                    on_response_failure(e)
+                    try:
+                        data, headers = serialize_response(*response_plan[code], data, headers, False)
+                    except Exception as e:
+                        return response_error(e)
             return data, code, headers
 
+        def cache_key(validated, view_args):
+            """Key of the request in `cache`, None when it isn't cached"""
+            if cache is None or request.method not in CACHED_METHODS:
+                return None
+            return cache.make_key(endpoint, validated, request.headers, view_args)
+
+        flights = SingleFlight() if coalesce else None
+
+        def flight_key(validated, view_args):
+            """Key of the request among the identical ones in flight, None when it isn't coalesced"""
+            if flights is None or request.method not in CACHED_METHODS:
+                return None
+            return coalesce_key(validated, view_args)
+
+        def lookup(validated, view_args):
+            """Set the validated data on the request; (cache key, cached response, coalescing key)"""
+            for name, value in validated:
+                setattr(request, name, value)
+            key = cache_key(validated, view_args)
+            cached = cache.get(key) if key is not None else None
+            return key, cached, flight_key(validated, view_args)
+
+        def reusable(result, shared):
+            """
+            Whether the `result` of a coalesced call can be returned,
+            a response object (a stream) can't be sent twice
+            """
+            return not shared or isinstance(result, tuple)
+
+        def store(key, result):
+            if key is not None:
+                cache.store(key, result)
+            return result
+
+        view = func
+        if metrics is not None:
+            extract_request = timed(metrics, endpoint, 'extract', extract_request)
+            make_response = timed(metrics, endpoint, 'response', make_response)
+            view = (async_timed if inspect.iscoroutinefunction(func) else timed)(metrics, endpoint, 'handler', func)
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kw):
+                try:
+                    # the request is read on the event loop thread, where its context lives
+                    extracted = extract_request()
+                    if validation_executor is None:
+                        validated = validate_request(extracted)
+                    else:
+                        validated = await asyncio.get_running_loop().run_in_executor(
+                            validation_executor, validate_request, extracted)
+                except HTTPException:
+                    # raised by werkzeug reading the request, e.g. 413 over MAX_CONTENT_LENGTH
+                    raise
+                except Exception as e:
+                    return request_error(e)
+                key, cached, shared_key = lookup(validated, kw)
+                if cached is not None:
+                    return cached
+
+                async def run():
+                    return make_response(await view(*args, **kw))
+
+                if shared_key is None:
+                    result = await run()
+                else:
+                    result, shared = await flights.do_async(shared_key, run)
+                    if not reusable(result, shared):
+                        result = await run()
+                return store(key, result)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kw):
+                try:
+                    validated = validate_request(extract_request())
+                except HTTPException:
+                    raise
+                except Exception as e:
+                    return request_error(e)
+                key, cached, shared_key = lookup(validated, kw)
+                if cached is not None:
+                    return cached
+
+                def run():
+                    return make_response(view(*args, **kw))
+
+                if shared_key is None:
+                    result = run()
+                else:
+                    result, shared = flights.do(shared_key, run)
+                    if not reusable(result, shared):
+                        result = run()
+                return store(key, result)
+
+        register_spec(wrapper, doc_dict, view_doc, doc_sources)
         return wrapper
 
     return decorator
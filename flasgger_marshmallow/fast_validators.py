@@ -0,0 +1,137 @@
+from collections import namedtuple
+from collections.abc import Mapping
+from marshmallow import Schema
+from marshmallow import ValidationError
+from marshmallow import fields
+from marshmallow import missing
+
+from .utils import MARSHMALLOW_V3
+
+if MARSHMALLOW_V3:
+    from marshmallow import EXCLUDE, INCLUDE, RAISE
+
+# fields whose deserialization only depends on their own value
+FLAT_FIELDS = {fields.String, fields.Integer, fields.Float, fields.Number, fields.Boolean}
+if hasattr(fields, 'Enum'):
+    FLAT_FIELDS.add(fields.Enum)
+
+# the generated load and dump functions of a flat schema
+CompiledSchema = namedtuple('CompiledSchema', ['load', 'dump'])
+
+
+def is_flat_schema(schema):
+    """
+    True when the marshmallow 3 `schema` instance only has flat fields and nothing
+    changing how Schema.load and Schema.dump run: hooks, validators, partial, many, ...
+    """
+    if not MARSHMALLOW_V3 or schema.many or schema.partial:
+        return False
+    if any(schema._hooks.values()) or type(schema).handle_error is not Schema.handle_error:
+        return False
+    for name, field in list(schema.load_fields.items()) + list(schema.dump_fields.items()):
+        if type(field) not in FLAT_FIELDS or '.' in (field.attribute or name):
+            return False
+    return True
+
+
+def load_default(field):
+    # `missing` before marshmallow 3.13
+    return field.load_default if hasattr(field, 'load_default') else field.missing
+
+
+def generate_load_source(schema):
+    """Source of `load(data)`, Schema.load unrolled over the load fields of `schema`"""
+    lines = [
+        'def load(data):',
+        '    data = data or {}',
+        '    if not isinstance(data, Mapping):',
+        '        raise ValidationError({"_schema": [type_message]}, data=data, valid_data=dict_class())',
+        '    ret = dict_class()',
+        '    errors = {}',
+    ]
+    for index, (attr_name, field) in enumerate(schema.load_fields.items()):
+        field_name = field.data_key if field.data_key is not None else attr_name
+        key = field.attribute or attr_name
+        lines.append('    value = data.get(%r, missing)' % field_name)
+        indent = '    '
+        if not field.required and load_default(field) is missing:
+            # nothing to load nor to report when the value is missing
+            lines.append('    if value is not missing:')
+            indent += '    '
+        lines += [
+            indent + 'try:',
+            indent + '    value = field_%d.deserialize(value, %r, data)' % (index, field_name),
+            indent + 'except ValidationError as error:',
+            indent + '    errors[%r] = error.messages' % field_name,
+            indent + 'else:',
+            indent + '    if value is not missing:',
+            indent + '        ret[%r] = value' % key,
+        ]
+    if schema.unknown != EXCLUDE:
+        lines.append('    for key in set(data) - known_keys:')
+        if schema.unknown == INCLUDE:
+            lines.append('        ret[key] = data[key]')
+        elif schema.unknown == RAISE:
+            lines.append('        errors[key] = [unknown_message]')
+    lines += [
+        '    if errors:',
+        '        raise ValidationError(errors, data=data, valid_data=ret)',
+        '    return ret',
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def generate_dump_source(schema):
+    """Source of `dump(obj)`, Schema.dump unrolled over the dump fields of `schema`"""
+    lines = [
+        'def dump(obj):',
+        '    ret = dict_class()',
+    ]
+    for index, (attr_name, field) in enumerate(schema.dump_fields.items()):
+        key = field.data_key if field.data_key is not None else attr_name
+        lines += [
+            '    value = dump_field_%d.serialize(%r, obj, accessor=get_attribute)' % (index, attr_name),
+            '    if value is not missing:',
+            '        ret[%r] = value' % key,
+        ]
+    lines.append('    return ret')
+    return '\n'.join(lines) + '\n'
+
+
+def compile_schema(schema):
+    """
+    Generate the load and dump functions of a flat `schema` instance, giving the same
+    results and ValidationError messages as its Schema.load and Schema.dump,
+    None when the schema isn't flat (see is_flat_schema)
+    """
+    if not is_flat_schema(schema):
+        return None
+    namespace = {
+        'Mapping': Mapping,
+        'ValidationError': ValidationError,
+        'missing': missing,
+        'dict_class': schema.dict_class,
+        'get_attribute': schema.get_attribute,
+        'type_message': schema.error_messages['type'],
+        'unknown_message': schema.error_messages['unknown'],
+        'known_keys': frozenset(
+            field.data_key if field.data_key is not None else name
+            for name, field in schema.load_fields.items()
+        ),
+    }
+    for index, field in enumerate(schema.load_fields.values()):
+        namespace['field_%d' % index] = field
+    for index, field in enumerate(schema.dump_fields.values()):
+        namespace['dump_field_%d' % index] = field
+    filename = '<fast validator of %s>' % type(schema).__name__
+    exec(compile(generate_load_source(schema), filename, 'exec'), namespace)
+    exec(compile(generate_dump_source(schema), filename, 'exec'), namespace)
+    return CompiledSchema(namespace['load'], namespace['dump'])
+
+
+def fast_data_schema(compiled, data, load_only=False):
+    """data_schema of a compiled schema"""
+    data = compiled.load(data)
+    if load_only:
+        return data
+    return compiled.dump(data)
@@ -0,0 +1,147 @@
+import re
+from flask import json
+from flask import request
+from marshmallow import fields
+
+from .utils import MARSHMALLOW_V3
+
+if MARSHMALLOW_V3:
+    from marshmallow import INCLUDE
+
+# the strings (skipped), the empty arrays and the structural characters of a JSON document
+JSON_TOKEN = re.compile(rb'"(?:[^"\\]|\\.)*"|\[\s*\]|[\[\]{},]')
+
+# fields loading a JSON scalar, any other field (Raw, Dict, Function, custom...) may hold nested data
+SCALAR_FIELDS = tuple(
+    getattr(fields, name) for name in (
+        'String', 'Number', 'Boolean', 'DateTime', 'Time', 'TimeDelta', 'Enum', 'IP', 'IPInterface')
+    if hasattr(fields, name)
+)
+
+
+class RequestLimitError(Exception):
+    """
+    A request over one of the limits, answered with `status` before its body is loaded;
+    `location` is the request attribute of the refused body
+    """
+
+    def __init__(self, message, status=400, location='json_schema'):
+        super(RequestLimitError, self).__init__(message)
+        self.status = status
+        self.location = location
+
+
+def field_depth(field, seen):
+    """Containers a field adds to the depth of its schema, None when unbounded"""
+    if isinstance(field, fields.Nested):
+        depth = schema_depth(type(field.schema), seen)
+        return depth and depth + (1 if field.many else 0)
+    if isinstance(field, fields.List):
+        inner = field.inner if MARSHMALLOW_V3 else field.container
+        depth = field_depth(inner, seen)
+        return None if depth is None else depth + 1
+    if hasattr(fields, 'Tuple') and isinstance(field, fields.Tuple):
+        depth = 0
+        for inner in field.tuple_fields:
+            current = field_depth(inner, seen)
+            if current is None:
+                return None
+            depth = max(depth, current)
+        return depth + 1
+    if isinstance(field, SCALAR_FIELDS):
+        return 0
+    return None
+
+
+def schema_depth(schema, seen=()):
+    """
+    Maximum nesting depth of the JSON documents loaded by `schema`, an object being 1,
+    None when unbounded: recursive schemas, fields that aren't scalars, containers or Nested
+    (Dict, Raw, Function, custom fields...), unknown keys included
+    """
+    if schema in seen:
+        return None
+    instance = schema()
+    if MARSHMALLOW_V3 and instance.unknown == INCLUDE:
+        return None
+    depth = 0
+    for field in instance.load_fields.values() if MARSHMALLOW_V3 else instance.fields.values():
+        current = field_depth(field, seen + (schema,))
+        if current is None:
+            return None
+        depth = max(depth, current)
+    return depth + 1
+
+
+def check_body_size(max_body_bytes, location):
+    length = request.content_length
+    if length is not None and length > max_body_bytes:
+        raise RequestLimitError('body larger than %d bytes' % max_body_bytes, 413, location)
+
+
+def scan_json(body, max_depth=None, max_array_length=None):
+    """
+    Check the nesting depth and the array lengths of the JSON `body` without parsing it,
+    skipped when its bracket or comma counts can't exceed the limits
+    """
+    if max_depth is not None and body.count(b'[') + body.count(b'{') <= max_depth:
+        max_depth = None
+    if max_array_length is not None and body.count(b',') < max_array_length:
+        max_array_length = None
+    if max_depth is None and max_array_length is None:
+        return
+    # the item count of each open array, None for the objects
+    stack = []
+    for match in JSON_TOKEN.finditer(body):
+        token = match.group()
+        if token in (b'[', b'{'):
+            stack.append(0 if token == b'[' else None)
+            if max_depth is not None and len(stack) > max_depth:
+                raise RequestLimitError('json nested deeper than %d' % max_depth)
+        elif token in (b']', b'}'):
+            if stack:
+                stack.pop()
+        elif token == b',':
+            if stack and stack[-1] is not None:
+                stack[-1] += 1
+                if max_array_length is not None and stack[-1] >= max_array_length:
+                    raise RequestLimitError('json array longer than %d items' % max_array_length)
+
+
+def limited_json_extractor(max_body_bytes=None, max_array_length=None, max_depth=None, default=None):
+    """
+    Extractor of the json body like request.get_json(silent=True), refusing it when over the limits
+    before it is parsed. A body without Content-Length is read up to the limit, and not cached on the request.
+    """
+    def extract():
+        if not request.is_json:
+            return default
+        if max_body_bytes is None:
+            body = request.get_data(cache=True)
+        else:
+            check_body_size(max_body_bytes, 'json_schema')
+            if request.content_length is None:
+                body = request.stream.read(max_body_bytes + 1)
+                if len(body) > max_body_bytes:
+                    raise RequestLimitError('body larger than %d bytes' % max_body_bytes, 413)
+            else:
+                body = request.get_data(cache=True)
+        if max_depth is not None or max_array_length is not None:
+            scan_json(body, max_depth, max_array_length)
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return default
+        if default is not None:
+            return data or default
+        return data
+
+    return extract
+
+
+def limited_form_extractor(max_body_bytes):
+    def extract():
+        check_body_size(max_body_bytes, 'form_schema')
+        return request.form
+
+    return extract
@@ -0,0 +1,124 @@
+import logging
+import queue
+import random
+import threading
+import time
+
+from flask import g
+from flask import has_request_context
+
+from .utils import LazyLogFormat
+
+logger = logging.getLogger('flasgger_marshmallow.decorators')
+
+
+def snapshot(content):
+    """Copy of the containers of a logged payload, so the view may keep mutating the original"""
+    if isinstance(content, LazyLogFormat):
+        return LazyLogFormat(snapshot(content.content), content.max_length)
+    if isinstance(content, (list, tuple)):
+        return [snapshot(item) for item in content]
+    if isinstance(content, dict):
+        return {key: snapshot(item) for key, item in content.items()}
+    if isinstance(content, set):
+        return set(content)
+    if hasattr(content, 'items'):
+        # werkzeug MultiDict / Headers
+        return {key: snapshot(item) for key, item in content.items()}
+    return content
+
+
+class QueueLogBackend(object):
+    """
+    Payload logging backend for swagger_decorator: records are snapshotted on the request
+    thread and written by a background thread, entries are sampled, rate limited per
+    endpoint and dropped (counted in `dropped`) instead of blocking when the queue is full.
+    """
+
+    def __init__(self, logger=logger, max_queue_size=1000, sample_rate=1.0, rate_limit=None):
+        """
+        :param sample_rate: fraction of the requests logged
+        :param rate_limit: maximum logged requests per second and endpoint, None for no limit
+        """
+        self.logger = logger
+        self.queue = queue.Queue(max_queue_size)
+        self.sample_rate = sample_rate
+        self.rate_limit = rate_limit
+        self.dropped = 0
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._thread = None
+
+    def is_enabled(self):
+        return self.logger.isEnabledFor(logging.INFO)
+
+    def log(self, endpoint, msg, *args):
+        """Queue a record, return False when it was sampled out, rate limited or dropped"""
+        if not self.is_sampled(endpoint):
+            return False
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+        try:
+            self.queue.put_nowait((msg, tuple(snapshot(arg) for arg in args)))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        return True
+
+    def is_sampled(self, endpoint):
+        """
+        Whether the records of the current request are logged, decided once per request
+        so that its request and response records are kept or dropped together
+        """
+        if not has_request_context():
+            return self._sample(endpoint)
+        decisions = g.setdefault('flasgger_marshmallow_log_sampled', {})
+        key = (id(self), endpoint)
+        if key not in decisions:
+            decisions[key] = self._sample(endpoint)
+        return decisions[key]
+
+    def _sample(self, endpoint):
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return False
+        return not self.rate_limit or self._acquire(endpoint)
+
+    def _acquire(self, endpoint):
+        # token bucket of `rate_limit` records refilled every second
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(endpoint, (self.rate_limit, now))
+            tokens = min(self.rate_limit, tokens + (now - last) * self.rate_limit)
+            if tokens < 1:
+                self._buckets[endpoint] = (tokens, now)
+                self.rate_limited += 1
+                return False
+            self._buckets[endpoint] = (tokens - 1, now)
+            return True
+
+    def start(self):
+        with self._lock:
+            # started lazily so that a backend created before forking works in the workers
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='flasgger-marshmallow-log', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=None):
+        """Write the queued records and stop the writer thread"""
+        if self._thread is not None and self._thread.is_alive():
+            self.queue.put(None)
+            self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            record = self.queue.get()
+            if record is None:
+                return
+            msg, args = record
+            try:
+                self.logger.info(msg, *args)
+            except Exception:
+                self.logger.exception('Can`t write payload log record')
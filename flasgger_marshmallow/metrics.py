@@ -0,0 +1,121 @@
+import bisect
+import functools
+import threading
+import time
+from collections import Counter
+
+# upper bounds in seconds of the histogram buckets, the Prometheus client defaults
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+
+class MetricsHook(object):
+    """
+    Receiver of the swagger_decorator measures, set as its `metrics` option.
+    Phases are 'extract', each request location ('path_schema', 'query_schema', ...),
+    'handler' and 'response'; error locations are the request locations, including the bodies
+    refused by the request limits, and 'response'. Both methods are optional, they do nothing here.
+    Called from the request threads (and the validation executors), implementations must be thread safe.
+    """
+
+    def observe(self, endpoint, phase, seconds):
+        pass
+
+    def count_error(self, endpoint, location):
+        pass
+
+
+class HistogramMetrics(MetricsHook):
+    """Histograms of the phase durations and counts of the errors, renderable as Prometheus text"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        # (endpoint, phase) -> [count by bucket (the last one is +Inf), sum, count]
+        self.histograms = {}
+        self.errors = Counter()
+        self._lock = threading.Lock()
+
+    def observe(self, endpoint, phase, seconds):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            histogram = self.histograms.get((endpoint, phase))
+            if histogram is None:
+                histogram = self.histograms[(endpoint, phase)] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            histogram[0][index] += 1
+            histogram[1] += seconds
+            histogram[2] += 1
+
+    def count_error(self, endpoint, location):
+        with self._lock:
+            self.errors[(endpoint, location)] += 1
+
+    def render_prometheus(self):
+        """The measures in the Prometheus text exposition format"""
+        with self._lock:
+            histograms = [(key, list(counts), total, count) for key, (counts, total, count) in self.histograms.items()]
+            errors = list(self.errors.items())
+        lines = [
+            '# HELP swagger_decorator_phase_seconds Time spent by the swagger_decorator endpoints in each phase',
+            '# TYPE swagger_decorator_phase_seconds histogram',
+        ]
+        bounds = ['%r' % bound for bound in self.buckets] + ['+Inf']
+        for (endpoint, phase), counts, total, count in sorted(histograms):
+            labels = 'endpoint="%s",phase="%s"' % (escape_label(endpoint), escape_label(phase))
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                lines.append('swagger_decorator_phase_seconds_bucket{%s,le="%s"} %d' % (labels, bound, cumulative))
+            lines.append('swagger_decorator_phase_seconds_sum{%s} %r' % (labels, total))
+            lines.append('swagger_decorator_phase_seconds_count{%s} %d' % (labels, count))
+        lines += [
+            '# HELP swagger_decorator_errors_total Requests rejected by the swagger_decorator endpoints by location',
+            '# TYPE swagger_decorator_errors_total counter',
+        ]
+        for (endpoint, location), count in sorted(errors):
+            lines.append('swagger_decorator_errors_total{endpoint="%s",location="%s"} %d' % (
+                escape_label(endpoint), escape_label(location), count))
+        return '\n'.join(lines) + '\n'
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def timed(metrics, endpoint, phase, function):
+    """`function` observing its duration as `phase` of `endpoint`"""
+    @functools.wraps(function)
+    def timed_function(*args, **kw):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kw)
+        finally:
+            metrics.observe(endpoint, phase, time.perf_counter() - start)
+
+    return timed_function
+
+
+def async_timed(metrics, endpoint, phase, function):
+    """timed for a coroutine function"""
+    @functools.wraps(function)
+    async def timed_function(*args, **kw):
+        start = time.perf_counter()
+        try:
+            return await function(*args, **kw)
+        finally:
+            metrics.observe(endpoint, phase, time.perf_counter() - start)
+
+    return timed_function
+
+
+def timed_validator(metrics, endpoint, location, validate):
+    """A request location validator observing its duration and counting its errors"""
+    def timed_validate(data):
+        start = time.perf_counter()
+        try:
+            return validate(data)
+        except Exception:
+            metrics.count_error(endpoint, location)
+            raise
+        finally:
+            metrics.observe(endpoint, location, time.perf_counter() - start)
+
+    return timed_validate
@@ -0,0 +1,103 @@
+import copy
+import inspect
+import threading
+
+from flask import current_app
+
+# view function -> (spec dict or its builder, view docstring, schemas and options the spec is built from),
+# filled by swagger_decorator
+SPEC_REGISTRY = {}
+_build_lock = threading.Lock()
+
+
+def register_spec(view, spec, doc=None, sources=None):
+    """`spec` may be a callable building the spec, called the first time it is needed"""
+    SPEC_REGISTRY[view] = (spec, doc, sources)
+
+
+def find_registered(view):
+    """
+    Return the registry entry of `view`, following the `__wrapped__` chain of the decorators
+    applied on top of swagger_decorator, without building its spec, or None.
+    """
+    while view is not None:
+        registered = SPEC_REGISTRY.get(view)
+        if registered is not None:
+            return view, registered
+        view = getattr(view, '__wrapped__', None)
+    return None
+
+
+def get_registered_spec(view):
+    """Return the (spec, docstring) registered for `view`, building the spec if needed, or None"""
+    found = find_registered(view)
+    if found is None:
+        return None
+    view, (spec, doc, sources) = found
+    if callable(spec):
+        with _build_lock:
+            spec, doc, sources = SPEC_REGISTRY[view]
+            if callable(spec):
+                spec = spec()
+                SPEC_REGISTRY[view] = (spec, doc, sources)
+    return spec, doc
+
+
+def iter_rule_methods(rule, ignore_verbs):
+    """Yield (verb, view method) of a werkzeug rule, as flasgger's get_specs resolves them"""
+    endpoint = current_app.view_functions[rule.endpoint]
+    view_class = getattr(endpoint, 'view_class', None)
+    for verb in sorted(rule.methods.difference(ignore_verbs)):
+        if view_class is not None:
+            yield verb.lower(), getattr(view_class, verb.lower(), None)
+        else:
+            yield verb.lower(), endpoint
+
+
+def is_registry_documented(method):
+    # specs attached by flasgger's swag_from or yml files still need get_specs
+    return (
+        find_registered(method) is not None
+        and not getattr(method, 'specs_dict', None)
+        and getattr(method, 'swag_path', None) is None
+        and getattr(method, 'swag_paths', None) is None
+    )
+
+
+def split_docstring(doc, sanitizer):
+    """Return the (summary, description) of a view docstring, like flasgger"""
+    if not doc:
+        return None, None
+    doc = inspect.cleandoc(doc)
+    summary, _, description = doc.partition('\n')
+    return sanitizer(summary), description and sanitizer(description)
+
+
+def get_registered_specs(rules, ignore_verbs, sanitizer):
+    """
+    Build the specs of the verbs registered by swagger_decorator without any docstring parsing.
+    Return ({id(rule): [(verb, swag)]}, rules having verbs left to flasgger's get_specs).
+    """
+    registered, others = {}, []
+    for rule in rules:
+        verbs = []
+        documented = True
+        for verb, method in iter_rule_methods(rule, ignore_verbs):
+            if method is None:
+                continue
+            if not is_registry_documented(method):
+                documented = False
+                continue
+            spec, doc = get_registered_spec(method)
+            swag = copy.deepcopy(spec)
+            summary, description = split_docstring(doc, sanitizer)
+            if summary:
+                swag['summary'] = summary
+            if description:
+                swag['description'] = description
+            verbs.append((verb, swag))
+        if verbs:
+            registered[id(rule)] = verbs
+        if not documented:
+            others.append(rule)
+    return registered, others
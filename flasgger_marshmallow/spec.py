@@ -0,0 +1,272 @@
+import threading
+
+from marshmallow import fields
+from marshmallow.utils import _Missing
+
+from .utils import PYTHON_TYPE_JSON_TYPE_MAP
+from .utils import is_marsh_v3
+from .utils import resolve_json_type
+
+
+class SchemaCompiler(object):
+    """
+    Compile marshmallow schemas to JSON schema properties.
+
+    Results are cached per (schema class, only, exclude) and nested fields per `many` too,
+    and shared by every decorator of the process: the returned fragments must not be mutated.
+    Nested schemas become `definitions` referenced with `$ref` with `nested_refs`, otherwise
+    they are expanded inline except when a schema nests itself, directly or not, in which
+    case the cycle is broken with a reference.
+    """
+
+    def __init__(self):
+        self.names = {}
+        self._taken_names = set()
+        self.definitions = {}
+        # definition name -> names it references directly
+        self.definition_refs = {}
+        self._properties = {}
+        self._nested = {}
+        self._compiling = set()
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def schema_key(schema):
+        schema_class = schema if isinstance(schema, type) else type(schema)
+        only = schema.__dict__.get('only')
+        exclude = schema.__dict__.get('exclude')
+        return schema_class, frozenset(only) if only else None, frozenset(exclude) if exclude else None
+
+    def definition_name(self, key):
+        name = self.names.get(key)
+        if name is None:
+            schema_class, only, exclude = key
+            base = schema_class.__name__
+            if only:
+                base += '_' + '_'.join(sorted(only))
+            if exclude:
+                base += '_exclude_' + '_'.join(sorted(exclude))
+            name = base
+            index = 1
+            while name in self._taken_names:
+                index += 1
+                name = '%s%d' % (base, index)
+            self.names[key] = name
+            self._taken_names.add(name)
+        return name
+
+    def compile(self, schema, nested_refs=True):
+        """Return (properties, names of the definitions they reference directly)"""
+        with self._lock:
+            return self._compile_properties(self.schema_key(schema), nested_refs)
+
+    def get_definitions(self, refs):
+        """All the definitions needed by `refs`, following references between definitions"""
+        with self._lock:
+            definitions, pending = {}, list(refs)
+            while pending:
+                name = pending.pop()
+                if name not in definitions:
+                    definitions[name] = self.definitions[name]
+                    pending.extend(self.definition_refs[name])
+            return definitions
+
+    def _definition(self, key):
+        name = self.definition_name(key)
+        if name not in self.definitions:
+            # registered before compiling, so that self referencing schemas stop here
+            self.definitions[name] = definition = {'type': 'object'}
+            self.definition_refs[name] = ()
+            definition['properties'], self.definition_refs[name] = self._compile_properties(key, True)
+        return name
+
+    def _compile_properties(self, key, nested_refs):
+        cache_key = key + (nested_refs,)
+        if cache_key in self._properties:
+            return self._properties[cache_key]
+        self._compiling.add(key)
+        try:
+            result = self._properties[cache_key] = self._parse_properties(key, nested_refs)
+        finally:
+            self._compiling.discard(key)
+        return result
+
+    def _compile_nested(self, field, parent_class, nested_refs):
+        if field.nested == 'self':
+            schema = parent_class(only=field.only, exclude=field.exclude or ())
+        else:
+            schema = field.schema
+        key = self.schema_key(schema)
+        cache_key = key + (field.many, nested_refs)
+        if cache_key in self._nested:
+            return self._nested[cache_key]
+        if nested_refs or key in self._compiling:
+            name = self._definition(key)
+            item, refs = {'$ref': '#/definitions/%s' % name}, (name,)
+            # siblings of a bare $ref are ignored, allOf keeps the description
+            fragment = {'type': 'array', 'items': item} if field.many else {'allOf': [item]}
+        else:
+            properties, refs = self._compile_properties(key, nested_refs)
+            item = {'type': 'object', 'properties': properties}
+            fragment = {'type': 'array', 'items': item} if field.many else item
+        if key not in self._compiling:
+            self._nested[cache_key] = fragment, refs
+        return fragment, refs
+
+    def _parse_properties(self, key, nested_refs):
+        schema_class, only, exclude = key
+        tmp = {}
+        refs = set()
+        for attr, value in schema_class._declared_fields.items():
+            if is_marsh_v3():
+                key = getattr(value, 'data_key', None) or attr
+            else:
+                key = getattr(value, 'load_from', None) or attr
+            if only and key not in only and attr not in only:
+                continue
+            if exclude and attr in exclude:
+                continue
+            tmp[key] = {
+                'description': value.metadata.get('doc', '')
+            }
+            current = tmp[key]
+            if isinstance(value, fields.Nested):
+                fragment, nested_refs_names = self._compile_nested(value, schema_class, nested_refs)
+                current.update(fragment)
+                refs.update(nested_refs_names)
+                continue
+
+            if isinstance(value, fields.List):
+                current['type'] = 'array'
+                current['items'] = {
+                    'type': 'string',
+                }
+                if not isinstance(value.default, _Missing):
+                    current['default'] = value.default
+                continue
+
+            if value.metadata.get('type'):
+                current['type'] = PYTHON_TYPE_JSON_TYPE_MAP[value.metadata.get('type').__name__]
+                current['required'] = value.required
+                continue
+
+            json_type = resolve_json_type(value.__class__)
+            if json_type:
+                current['type'] = json_type
+                current['required'] = value.required
+                continue
+
+            current['default'] = value.default
+
+        return tmp, tuple(sorted(refs))
+
+
+# shared by every swagger_decorator of the process
+SCHEMA_COMPILER = SchemaCompiler()
+
+
+def parse_simple_schema(c_schema, location):
+    ret = []
+    for key, value in c_schema.__dict__.get('_declared_fields').items():
+        type_field = (resolve_json_type(value.__class__)
+                      or f'unsupported type {str(type(value))} (simple schema)')
+        if is_marsh_v3():
+            name = getattr(value, 'data_key', None) or key
+        else:
+            name = getattr(value, 'load_from', None) or key
+        tmp = {
+            'in': location,
+            'name': name,
+            'type': type_field,
+            'required': value.required if location != 'path' else True,
+            'description': value.metadata.get('doc', '')
+        }
+        if not isinstance(value.default, _Missing):
+            tmp['default'] = value.default
+        ret.append(tmp)
+    return ret
+
+
+def parse_json_schema(r_s, definitions, nested_refs=True):
+    """
+    Properties of a schema, the definitions they reference are added to `definitions`.
+    Nested schemas are referenced with `nested_refs`, otherwise expanded inline
+    (except the recursive ones).
+    """
+    properties, refs = SCHEMA_COMPILER.compile(r_s, nested_refs)
+    if refs:
+        definitions.update(SCHEMA_COMPILER.get_definitions(refs))
+    return properties
+
+
+def parse_request_body_json_schema(c_schema, definitions, nested_refs=True, many=False):
+    tmp = {
+        'in': 'body',
+        'name': 'body',
+        'required': True,
+        'description': 'json type of body',
+        'schema': {
+            'properties': parse_json_schema(c_schema, definitions, nested_refs),
+            'type': 'object',
+        }
+    }
+    if many:
+        tmp['schema'] = {'type': 'array', 'items': tmp['schema']}
+    return [tmp]
+
+
+def generate_doc(
+    path_schema=None, query_schema=None,
+    form_schema=None, json_schema=None,
+    headers_schema=None, response_schema=None,
+    tags=None, nested_refs=True, json_many=False
+):
+    doc_dict = {}
+    definitions = {}
+    if path_schema or query_schema or form_schema or json_schema or headers_schema:
+        doc_dict['parameters'] = []
+    if path_schema:
+        doc_dict['parameters'].extend(parse_simple_schema(path_schema, 'path'))
+    if query_schema:
+        doc_dict['parameters'].extend(parse_simple_schema(query_schema, 'query'))
+    if form_schema:
+        doc_dict['parameters'].extend(parse_simple_schema(form_schema, 'formData'))
+    if headers_schema:
+        doc_dict['parameters'].extend(parse_simple_schema(headers_schema, 'header'))
+    if json_schema:
+        doc_dict['parameters'].extend(parse_request_body_json_schema(json_schema, definitions, nested_refs, json_many))
+    if response_schema:
+        doc_dict['responses'] = {}
+        for code, current_schema in response_schema.items():
+            current = parse_json_schema(current_schema, definitions, nested_refs)
+            # print(code, current)
+            # if current.type == 'unsupported type':
+            #     print('unsupported type')
+            #     continue
+            doc_dict['responses'][code] = {
+                'description': current_schema.__doc__,
+                'schema': {
+                    'type': 'object',
+                    "properties": current,
+                },
+            }
+            if not doc_dict['responses'][code].get('schema', {}).get('properties'):
+                doc_dict['responses'][code].update({'schema': None})
+            if getattr(current_schema.Meta, 'headers', None):
+                doc_dict['responses'][code].update(
+                    {'headers': parse_json_schema(current_schema.Meta.headers, definitions, nested_refs)}
+                )
+            produces = getattr(current_schema.Meta, 'produces', None)
+            if produces:
+                doc_dict.setdefault('produces', [])
+                doc_dict['produces'].extend(produces)
+                ('application/xml' in produces and doc_dict['responses'][code]['schema'] and doc_dict
+                    ['responses'][code]['schema']
+                    .update({'xml': {'name': getattr(current_schema.Meta, 'xml_root', 'xml')}}))
+
+    if tags:
+        doc_dict['tags'] = tags
+    if definitions:
+        doc_dict['definitions'] = definitions
+
+    return doc_dict
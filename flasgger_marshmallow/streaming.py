@@ -0,0 +1,111 @@
+import functools
+from collections import namedtuple
+from collections.abc import Mapping
+from flask import Response
+from flask import json
+from flask import stream_with_context
+from marshmallow import fields
+from marshmallow import missing
+
+from .utils import data_schema, dump_schema, schema_instance_getter
+
+# bytes of JSON buffered before a chunk of a streamed body is written
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# getters of the response schema without the streamed field, of its headers schema and
+# of the schema of one streamed item; name of the field in the view result and in the body
+StreamPlan = namedtuple('StreamPlan', ['get_schema', 'get_headers_schema', 'get_item_schema', 'name', 'key'])
+
+
+def build_stream_plan(response_schema, stream_field):
+    """
+    Map every response code whose schema declares the Nested(many=True) `stream_field`
+    to its StreamPlan
+    """
+    plan = {}
+    for code, current_schema in (response_schema or {}).items():
+        field = current_schema().fields.get(stream_field)
+        if field is None:
+            continue
+        if not isinstance(field, fields.Nested) or not field.many:
+            raise ValueError('stream_field {0} of {1} must be a Nested(many=True) field'.format(
+                stream_field, current_schema.__name__))
+        item_schema = functools.partial(type(field.schema), only=field.only, exclude=field.exclude)
+        r_headers_schema = getattr(current_schema.Meta, 'headers', None)
+        plan[code] = StreamPlan(
+            schema_instance_getter(functools.partial(current_schema, exclude=(stream_field,))),
+            r_headers_schema and schema_instance_getter(r_headers_schema),
+            schema_instance_getter(item_schema),
+            stream_field,
+            getattr(field, 'data_key', None) or getattr(field, 'dump_to', None) or stream_field,
+        )
+    return plan
+
+
+def serialize_part(schema, value, validate_response, tolerant, on_failure, fallback=missing):
+    """
+    Dump one part of a streamed response, loading it first when validate_response() says so;
+    a `tolerant` validation failure goes to `on_failure` and the part is only dumped.
+    With a `fallback`, a tolerant part that can't be dumped either is returned as the fallback.
+    """
+    validate = validate_response()
+    try:
+        return (data_schema if validate else dump_schema)(schema, value)
+    except Exception as e:
+        if not (tolerant and (validate or fallback is not missing)):
+            raise
+        on_failure(e)
+        if not validate:
+            return fallback
+    try:
+        return dump_schema(schema, value)
+    except Exception:
+        if fallback is missing:
+            raise
+        return fallback
+
+
+def stream_response(plan, data, code, headers, validate_response, sampled, on_failure):
+    """
+    Write the view result `data` as a chunked JSON response, the items of its streamed field
+    being pulled from their iterable and serialized one at a time.
+    The other fields, the headers and the first item are serialized before the response
+    starts, so their validation errors raise as usual; once started a response can't turn
+    into an error, so the failures of the next items go to `on_failure` and they are only dumped,
+    or written as null when they can't be dumped either.
+    """
+    serialize = functools.partial(
+        serialize_part, validate_response=validate_response, on_failure=on_failure)
+    if isinstance(data, Mapping):
+        rest = dict(data)
+        items = rest.pop(plan.name, None)
+    else:
+        # an object, whose streamed attribute the schema of the other fields excludes
+        rest, items = data, getattr(data, plan.name, None)
+    items = iter(items or ())
+    head = serialize(plan.get_schema(), rest, tolerant=sampled)
+    if plan.get_headers_schema:
+        headers = serialize(plan.get_headers_schema(), headers, tolerant=sampled)
+    first = next(items, missing)
+    if first is not missing:
+        first = serialize(plan.get_item_schema(), first, tolerant=sampled)
+
+    def generate():
+        head_json = json.dumps(head)
+        chunk = [head_json[:-1], ',' if head else '', json.dumps(plan.key), ':[']
+        if first is not missing:
+            chunk.append(json.dumps(first))
+            size = 0
+            item_schema = plan.get_item_schema()
+            for item in items:
+                item_json = json.dumps(serialize(item_schema, item, tolerant=True, fallback=None))
+                chunk.append(',')
+                chunk.append(item_json)
+                size += len(item_json)
+                if size >= STREAM_CHUNK_SIZE:
+                    yield ''.join(chunk)
+                    chunk, size = [], 0
+        chunk.append(']}')
+        yield ''.join(chunk)
+
+    return Response(stream_with_context(generate()), status=code, headers=headers, mimetype='application/json')
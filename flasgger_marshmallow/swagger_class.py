@@ -1,5 +1,17 @@
+import copy
+import functools
+import gzip
+import hashlib
+import logging
+import os
 import re
 from collections import defaultdict
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from flask import Response
+from flask import current_app
+from flask import json
+from flask import request
 from flasgger.base import Swagger as FSwagger
 from flasgger.constants import OPTIONAL_FIELDS
 from flasgger.constants import OPTIONAL_OAS3_FIELDS
@@ -8,23 +20,485 @@ from flasgger.utils import get_specs
 from flasgger.utils import get_vendor_extension_fields
 from flasgger.utils import parse_definition_docstring
 
+from .artifacts import apispec_fingerprint
+from .artifacts import cache_path
+from .artifacts import read_artifact
+from .artifacts import read_manifest
+from .artifacts import write_atomic
+from .cli import prebuild_command
+from .decorators import DECORATOR_DEFAULTS
+from .registry import find_registered
+from .registry import get_registered_specs
+from .registry import iter_rule_methods
+
+
+logger = logging.getLogger(__name__)
+
+# bytes of an mmapped apispec artifact written per chunk
+MMAP_CHUNK_SIZE = 64 * 1024
+
+
+def rule_cache_key(rule):
+    return rule.endpoint, rule.rule, tuple(sorted(rule.methods))
+
+
+@functools.lru_cache(maxsize=None)
+def rule_to_path(rule, prefix, base_path):
+    """Convert a werkzeug rule like `/users/<int:id>` to a swagger path like `/users/{id}`"""
+    srule = '{0}{1}'.format(prefix, rule)
+    # handle basePath
+    if base_path:
+        if base_path.endswith('/'):
+            base_path = base_path[:-1]
+        if base_path:
+            # suppress base_path from srule if needed.
+            # Otherwise we will get definitions twice...
+            if srule.startswith(base_path):
+                srule = srule[len(base_path):]
+
+    # old regex '(<(.*?\:)?(.*?)>)'
+    for arg in re.findall('(<([^<>]*:)?([^<>]*)>)', srule):
+        srule = srule.replace(arg[0], '{%s}' % arg[2])
+    return srule
+
+
+def replace_refs(obj, old_prefix, new_prefix):
+    """
+    Copy of `obj` with the `$ref` starting with `old_prefix` rewritten, the cached
+    operations and definitions it shares with other builds are left untouched
+    """
+    if isinstance(obj, dict):
+        return {
+            key: new_prefix + value[len(old_prefix):]
+            if key == '$ref' and isinstance(value, str) and value.startswith(old_prefix)
+            else replace_refs(value, old_prefix, new_prefix)
+            for key, value in obj.items()
+        }
+    if isinstance(obj, list):
+        return [replace_refs(item, old_prefix, new_prefix) for item in obj]
+    return obj
+
+
+def iter_chunks(body, chunk_size=MMAP_CHUNK_SIZE):
+    """The bytes slices of an mmapped artifact, WSGI servers only write bytes"""
+    for start in range(0, len(body), chunk_size):
+        yield body[start:start + chunk_size]
+
+
+def make_body_response(body):
+    if isinstance(body, bytes):
+        return Response(body, mimetype='application/json')
+    # mmap of a prebuilt artifact, copied out a slice at a time
+    response = Response(iter_chunks(body), mimetype='application/json', direct_passthrough=True)
+    response.content_length = len(body)
+    return response
+
+
+# a built apispec with its JSON body, gzipped body and ETag
+SerializedSpec = namedtuple('SerializedSpec', ['data', 'body', 'gzip_body', 'etag'])
+
+
+def serialize_apispec(data):
+    body = json.dumps(data, separators=(',', ':')).encode('utf-8')
+    return SerializedSpec(data, body, gzip.compress(body), hashlib.sha1(body).hexdigest())
+
 
 class Swagger(FSwagger):
 
+    def __init__(self, *args, **kwargs):
+        self.serialized_apispecs = {}
+        self.prebuilt_apispecs = {}
+        self.apispec_fingerprints = {}
+        # rule -> (fingerprint, operations, definition updates), see build_rule_operations
+        self.rule_operations = {}
+        super(Swagger, self).__init__(*args, **kwargs)
+
+    def init_app(self, app, decorators=None):
+        super(Swagger, self).init_app(app, decorators)
+        app.cli.add_command(prebuild_command)
+
+    def register_views(self, app):
+        super(Swagger, self).register_views(app)
+        # serve the specs from their pre-serialized bytes instead of flasgger's APISpecsView
+        for spec in self.config['specs']:
+            view = self.make_apispecs_view(spec['endpoint'])
+            for decorator in self.decorators or ():
+                view = decorator(view)
+            app.view_functions['%s.%s' % (self.config.get('endpoint', 'flasgger'), spec['endpoint'])] = view
+
+        if self.config.get('metrics_route'):
+            view = self.make_metrics_view()
+            for decorator in self.decorators or ():
+                view = decorator(view)
+            app.add_url_rule(self.config['metrics_route'], 'swagger_metrics', view)
+
+    def make_metrics_view(self):
+        """
+        View of the Prometheus text of `config['metrics']`, by default DECORATOR_DEFAULTS['metrics'],
+        a HistogramMetrics or any MetricsHook with a render_prometheus method
+        """
+        def metrics_view():
+            metrics = self.config.get('metrics') or DECORATOR_DEFAULTS['metrics']
+            body = metrics.render_prometheus() if metrics is not None else ''
+            return Response(body, mimetype='text/plain; version=0.0.4')
+
+        return metrics_view
+
+    def make_apispecs_view(self, endpoint):
+        def apispecs_view():
+            serialized = self.get_serialized_apispecs(endpoint)
+            if request.accept_encodings['gzip'] > 0:
+                response = make_body_response(serialized.gzip_body)
+                response.headers['Content-Encoding'] = 'gzip'
+                response.set_etag(serialized.etag + '-gzip')
+            else:
+                response = make_body_response(serialized.body)
+                response.set_etag(serialized.etag)
+            response.vary.add('Accept-Encoding')
+            # answers 304 Not Modified on a matching If-None-Match
+            return response.make_conditional(request)
+
+        apispecs_view.__name__ = endpoint
+        return apispecs_view
+
+    def get_serialized_apispecs(self, endpoint='api'):
+        """
+        The apispec of `endpoint` as JSON bytes, gzipped bytes and ETag,
+        serialized again only when get_apispecs returns a new spec (debug mode)
+        """
+        prebuilt = self.get_prebuilt_apispecs(endpoint)
+        if prebuilt is not None:
+            return prebuilt
+        data = self.get_apispecs(endpoint)
+        serialized = self.serialized_apispecs.get(endpoint)
+        if serialized is None or serialized.data is not data:
+            serialized = serialize_apispec(data)
+            self.serialized_apispecs[endpoint] = serialized
+            if self.config.get('apispec_cache_dir') and not self.app.debug:
+                self.write_cached_apispec(endpoint, serialized)
+        return serialized
+
+    def build_serialized_apispecs(self, endpoints=None):
+        """
+        Serialized apispecs of `endpoints` (default every configured spec) built from the
+        current code, bypassing the artifacts and the apispec cache. Call it within an app context.
+        """
+        return {endpoint: serialize_apispec(data) for endpoint, data in self.build_apispecs(endpoints).items()}
+
+    def get_prebuilt_apispecs(self, endpoint):
+        """
+        The apispec of `endpoint` loaded from the artifacts of `config['apispec_artifacts']`
+        (see the swagger-prebuild command) or from the cache of `config['apispec_cache_dir']`,
+        None when none is configured, in debug mode, or when missing or out of date
+        """
+        if self.app.debug:
+            return None
+        if endpoint in self.prebuilt_apispecs:
+            return self.prebuilt_apispecs[endpoint]
+
+        serialized = None
+        if self.config.get('apispec_artifacts'):
+            serialized = self.load_apispec_artifact(endpoint)
+        if serialized is None and self.config.get('apispec_cache_dir'):
+            serialized = self.load_cached_apispec(endpoint)
+        self.prebuilt_apispecs[endpoint] = serialized
+        return serialized
+
+    def load_apispec_artifact(self, endpoint):
+        directory = self.config['apispec_artifacts']
+        manifest = read_manifest(directory)
+        entry = manifest and manifest['specs'].get(endpoint)
+        if entry is None:
+            logger.warning('No apispec artifact of %s in %s, building it', endpoint, directory)
+            return None
+        if (self.config.get('apispec_artifacts_check', True)
+                and self.get_apispec_fingerprint(endpoint) != entry['fingerprint']):
+            logger.warning('The apispec artifact of %s in %s is out of date, building it', endpoint, directory)
+            return None
+        use_mmap = self.config.get('apispec_artifacts_mmap', False)
+        path = os.path.join(directory, endpoint + '.json')
+        return SerializedSpec(
+            None, read_artifact(path, use_mmap), read_artifact(path + '.gz', use_mmap), entry['etag'])
+
+    def load_cached_apispec(self, endpoint):
+        path = cache_path(self.config['apispec_cache_dir'], endpoint, self.get_apispec_fingerprint(endpoint))
+        if not os.path.isfile(path) or not os.path.isfile(path + '.gz'):
+            return None
+        body = read_artifact(path)
+        return SerializedSpec(None, body, read_artifact(path + '.gz'), hashlib.sha1(body).hexdigest())
+
+    def write_cached_apispec(self, endpoint, serialized):
+        """Share a built apispec with the other workers and the next starts through the cache directory"""
+        directory = self.config['apispec_cache_dir']
+        try:
+            os.makedirs(directory, exist_ok=True)
+            path = cache_path(directory, endpoint, self.get_apispec_fingerprint(endpoint))
+            write_atomic(path + '.gz', serialized.gzip_body)
+            write_atomic(path, serialized.body)
+        except OSError:
+            logger.exception('Can`t write the apispec cache of %s in %s', endpoint, directory)
+
+    def get_apispec_fingerprint(self, endpoint):
+        if endpoint not in self.apispec_fingerprints:
+            self.apispec_fingerprints[endpoint] = apispec_fingerprint(self, self.get_spec_config(endpoint))
+        return self.apispec_fingerprints[endpoint]
+
+    def warmup(self):
+        """
+        Build every configured apispec and its serialized bytes now, e.g. in the gunicorn master
+        before it forks, so that the workers inherit them instead of each building them again
+        """
+        with self.app.app_context():
+            endpoints = [spec['endpoint'] for spec in self.config['specs']]
+            self.build_apispecs([
+                endpoint for endpoint in endpoints if self.get_prebuilt_apispecs(endpoint) is None])
+            for endpoint in endpoints:
+                self.get_serialized_apispecs(endpoint)
+
+    def get_spec_config(self, endpoint):
+        for spec in self.config['specs']:
+            if spec['endpoint'] == endpoint:
+                return spec
+        raise RuntimeError(
+            'Can`t find specs by endpoint {:s},'
+            ' check your flasger`s config'.format(endpoint))
+
+    def get_rule_specs(self, rules, ignore_verbs, optional_fields):
+        """(rule, [(verb, swag)]) of the documented `rules`"""
+        if self.config.get('doc_dir'):
+            registered, docstring_rules = {}, rules
+        else:
+            # swagger_decorator specs come from the registry, only the other views are parsed
+            registered, docstring_rules = get_registered_specs(rules, ignore_verbs, self.sanitizer)
+        docstring_specs = {}
+        if docstring_rules:
+            docstring_specs = {
+                id(rule): verbs for rule, verbs in get_specs(
+                    docstring_rules, ignore_verbs, optional_fields, self.sanitizer,
+                    doc_dir=self.config.get('doc_dir'))
+            }
+        specs = []
+        for rule in rules:
+            verbs = registered.get(id(rule), [])
+            registered_verbs = {verb for verb, _ in verbs}
+            verbs = verbs + [
+                (verb, swag) for verb, swag in docstring_specs.get(id(rule), [])
+                if verb not in registered_verbs
+            ]
+            if verbs:
+                specs.append((rule, verbs))
+        return specs
+
+    @staticmethod
+    def rule_fingerprint(rule, ignore_verbs):
+        """Identity of the view methods of `rule` and of their specs, to detect changed rules"""
+        fingerprint = [id(current_app.view_functions[rule.endpoint])]
+        for verb, method in iter_rule_methods(rule, ignore_verbs):
+            registered = find_registered(method)
+            fingerprint.append((
+                verb, id(method), registered and id(registered[1][2]),
+                getattr(method, '__doc__', None), id(getattr(method, 'specs_dict', None)),
+            ))
+        return tuple(fingerprint)
+
+    def build_rule_operations(self, rule, verbs, prefix_ids, optional_fields):
+        """
+        Return the operations of `rule` by verb and the updates of the definitions
+        they bring, as (definition id or None to update the whole definitions, definition)
+        """
+        http_methods = ['get', 'post', 'put', 'delete']
+        operations = dict()
+        definition_updates = []
+        for verb, swag in verbs:
+            update_dict = swag.get('definitions', {})
+            if type(update_dict) is list and type(update_dict[0]) is dict:
+                # pop, assert single element
+                update_dict, = update_dict
+            definition_updates.append((None, update_dict))
+            defs = []  # swag.get('definitions', [])
+            defs += extract_definitions(
+                defs, endpoint=rule.endpoint, verb=verb,
+                prefix_ids=prefix_ids
+            )
+
+            params = swag.get('parameters', [])
+            if verb in swag.keys():
+                verb_swag = swag.get(verb)
+                if len(params) == 0 and verb.lower() in http_methods:
+                    params = verb_swag.get('parameters', [])
+
+            defs += extract_definitions(params,
+                                        endpoint=rule.endpoint,
+                                        verb=verb,
+                                        prefix_ids=prefix_ids)
+
+            request_body = swag.get('requestBody')
+            if request_body:
+                content = request_body.get("content", {})
+                extract_definitions(
+                    list(content.values()),
+                    endpoint=rule.endpoint,
+                    verb=verb,
+                    prefix_ids=prefix_ids
+                )
+
+            callbacks = swag.get("callbacks", {})
+            if callbacks:
+                callbacks = {
+                    str(key): value
+                    for key, value in callbacks.items()
+                }
+                extract_definitions(
+                    list(callbacks.values()),
+                    endpoint=rule.endpoint,
+                    verb=verb,
+                    prefix_ids=prefix_ids
+                )
+
+            responses = None
+            if 'responses' in swag:
+                responses = swag.get('responses', {})
+                responses = {
+                    str(key): value
+                    for key, value in responses.items()
+                }
+                if responses is not None:
+                    defs = defs + extract_definitions(
+                        responses.values(),
+                        endpoint=rule.endpoint,
+                        verb=verb,
+                        prefix_ids=prefix_ids
+                    )
+                for definition in defs:
+                    if 'id' not in definition:
+                        definition_updates.append((None, definition))
+                        continue
+                    def_id = definition.pop('id')
+                    if def_id is not None:
+                        definition_updates.append((def_id, definition))
+
+            operation = {}
+            if swag.get('summary'):
+                operation['summary'] = swag.get('summary')
+            if swag.get('description'):
+                operation['description'] = swag.get('description')
+            if request_body:
+                operation['requestBody'] = request_body
+            if callbacks:
+                operation['callbacks'] = callbacks
+            if responses:
+                operation['responses'] = responses
+            # parameters - swagger ui dislikes empty parameter lists
+            if len(params) > 0:
+                operation['parameters'] = params
+            # other optionals
+            for key in optional_fields:
+                if key in swag:
+                    value = swag.get(key)
+                    if key in ('produces', 'consumes'):
+                        if not isinstance(value, (list, tuple)):
+                            value = [value]
+
+                    operation[key] = value
+            operations[verb] = operation
+        return operations, definition_updates
+
     def get_apispecs(self, endpoint='api'):
         if not self.app.debug and endpoint in self.apispecs:
             return self.apispecs[endpoint]
 
-        spec = None
-        for _spec in self.config['specs']:
-            if _spec['endpoint'] == endpoint:
-                spec = _spec
-                break
-        if not spec:
-            raise RuntimeError(
-                'Can`t find specs by endpoint {:d},'
-                ' check your flasger`s config'.format(endpoint))
+        prebuilt = self.get_prebuilt_apispecs(endpoint)
+        if prebuilt is not None:
+            self.apispecs[endpoint] = json.loads(bytes(prebuilt.body).decode('utf-8'))
+            return self.apispecs[endpoint]
+
+        spec = self.get_spec_config(endpoint)
+        rules = self.get_url_mappings(spec.get('rule_filter'))
+        self.update_rule_operations(rules)
+        return self.assemble_apispecs(spec, rules)
+
+    def build_apispecs(self, endpoints=None, max_workers=None):
+        """
+        Build the apispecs of `endpoints` (default every configured spec) together:
+        a single pass over the url map dispatches the rules to the specs whose rule_filter
+        accepts them, the rules and definition models shared by several specs are parsed once,
+        then each spec is assembled on a thread pool of `max_workers`
+        """
+        if endpoints is None:
+            endpoints = [spec['endpoint'] for spec in self.config['specs']]
+        if not endpoints:
+            return {}
+        specs = [self.get_spec_config(endpoint) for endpoint in endpoints]
+        rule_filters = [spec.get('rule_filter') or (lambda rule: True) for spec in specs]
+
+        spec_rules = [[] for _ in specs]
+        rules = []
+        for rule in current_app.url_map.iter_rules():
+            matched = False
+            for index, rule_filter in enumerate(rule_filters):
+                if rule_filter(rule):
+                    spec_rules[index].append(rule)
+                    matched = True
+            if matched:
+                rules.append(rule)
+        self.update_rule_operations(rules)
+
+        parsed_definitions = self.parse_def_models(self.get_def_models())
+        app = current_app._get_current_object()
+
+        def assemble(index):
+            with app.app_context():
+                return self.assemble_apispecs(specs[index], spec_rules[index], parsed_definitions)
 
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return dict(zip(endpoints, executor.map(assemble, range(len(specs)))))
+
+    def parse_def_models(self, def_models):
+        """The definitions of the `def_models` by name, from their docstrings"""
+        parsed = {}
+        for name, def_model in def_models.items():
+            description, swag = parse_definition_docstring(def_model, self.sanitizer)
+            if name and swag:
+                if description:
+                    swag.update({'description': description})
+                parsed[name] = swag
+        return parsed
+
+    def update_rule_operations(self, rules):
+        """Parse again the operations of the `rules` added or changed since the last build"""
+        ignore_verbs = set(
+            self.config.get('ignore_verbs', ("HEAD", "OPTIONS"))
+        )
+        # technically only responses is non-optional
+        optional_fields = self.config.get('optional_fields') or OPTIONAL_FIELDS
+        # if True schemaa ids will be prefized by function_method_{id}
+        # for backwards compatibility with <= 0.5.14
+        prefix_ids = self.config.get('prefix_ids')
+
+        stale_rules = []
+        fingerprints = {}
+        for rule in rules:
+            fingerprints[id(rule)] = self.rule_fingerprint(rule, ignore_verbs)
+            cached = self.rule_operations.get(rule_cache_key(rule))
+            if cached is None or cached[0] != fingerprints[id(rule)]:
+                stale_rules.append(rule)
+
+        rule_specs = {
+            id(rule): verbs for rule, verbs in self.get_rule_specs(stale_rules, ignore_verbs, optional_fields)
+        }
+        for rule in stale_rules:
+            operations, definition_updates = {}, ()
+            if id(rule) in rule_specs:
+                operations, definition_updates = self.build_rule_operations(
+                    rule, rule_specs[id(rule)], prefix_ids, optional_fields)
+            self.rule_operations[rule_cache_key(rule)] = (
+                fingerprints[id(rule)], operations, definition_updates)
+
+    def assemble_apispecs(self, spec, rules, parsed_definitions=None):
+        """
+        Assemble the apispec of `spec` from the cached operations of its `rules`,
+        `parsed_definitions` are the definition models already parsed by name
+        """
         data = {
             # try to get from config['SWAGGER']['info']
             # then config['SWAGGER']['specs'][x]
@@ -46,8 +520,9 @@ class Swagger(FSwagger):
                                                       "/tos")
                 ),
             },
-            "paths": self.config.get('paths') or defaultdict(dict),
-            "definitions": self.config.get('definitions') or defaultdict(dict)
+            # copied, the builds must not write into the config
+            "paths": copy.deepcopy(self.config.get('paths')) or defaultdict(dict),
+            "definitions": copy.deepcopy(self.config.get('definitions')) or defaultdict(dict)
         }
 
         openapi_version = self.config.get('openapi')
@@ -63,10 +538,6 @@ class Swagger(FSwagger):
         if top_level_extension_options:
             data.update(top_level_extension_options)
 
-        # if True schemaa ids will be prefized by function_method_{id}
-        # for backwards compatibility with <= 0.5.14
-        prefix_ids = self.config.get('prefix_ids')
-
         if self.config.get('host'):
             data['host'] = self.config.get('host')
         if self.config.get("basePath"):
@@ -98,146 +569,39 @@ class Swagger(FSwagger):
 
         paths = data['paths']
         definitions = data['definitions']
-        ignore_verbs = set(
-            self.config.get('ignore_verbs', ("HEAD", "OPTIONS"))
-        )
-
-        # technically only responses is non-optional
-        optional_fields = self.config.get('optional_fields') or OPTIONAL_FIELDS
-
-        for name, def_model in self.get_def_models(spec.get('definition_filter')).items():
-            description, swag = parse_definition_docstring(def_model, self.sanitizer)
-            if name and swag:
-                if description:
-                    swag.update({'description': description})
-                definitions[name].update(swag)
-
-        specs = get_specs(
-            self.get_url_mappings(spec.get('rule_filter')), ignore_verbs,
-            optional_fields, self.sanitizer,
-            doc_dir=self.config.get('doc_dir'))
-
-        http_methods = ['get', 'post', 'put', 'delete']
-        for rule, verbs in specs:
-            operations = dict()
-            for verb, swag in verbs:
-                update_dict = swag.get('definitions', {})
-                if type(update_dict) is list and type(update_dict[0]) is dict:
-                    # pop, assert single element
-                    update_dict, = update_dict
-                definitions.update(update_dict)
-                defs = []  # swag.get('definitions', [])
-                defs += extract_definitions(
-                    defs, endpoint=rule.endpoint, verb=verb,
-                    prefix_ids=prefix_ids
-                )
-
-                params = swag.get('parameters', [])
-                if verb in swag.keys():
-                    verb_swag = swag.get(verb)
-                    if len(params) == 0 and verb.lower() in http_methods:
-                        params = verb_swag.get('parameters', [])
-
-                defs += extract_definitions(params,
-                                            endpoint=rule.endpoint,
-                                            verb=verb,
-                                            prefix_ids=prefix_ids)
-
-                request_body = swag.get('requestBody')
-                if request_body:
-                    content = request_body.get("content", {})
-                    extract_definitions(
-                        list(content.values()),
-                        endpoint=rule.endpoint,
-                        verb=verb,
-                        prefix_ids=prefix_ids
-                    )
 
-                callbacks = swag.get("callbacks", {})
-                if callbacks:
-                    callbacks = {
-                        str(key): value
-                        for key, value in callbacks.items()
-                    }
-                    extract_definitions(
-                        list(callbacks.values()),
-                        endpoint=rule.endpoint,
-                        verb=verb,
-                        prefix_ids=prefix_ids
-                    )
+        def_models = self.get_def_models(spec.get('definition_filter'))
+        if parsed_definitions is None:
+            parsed_definitions = self.parse_def_models(def_models)
+        for name in def_models:
+            if name in parsed_definitions:
+                definitions[name].update(parsed_definitions[name])
 
-                responses = None
-                if 'responses' in swag:
-                    responses = swag.get('responses', {})
-                    responses = {
-                        str(key): value
-                        for key, value in responses.items()
-                    }
-                    if responses is not None:
-                        defs = defs + extract_definitions(
-                            responses.values(),
-                            endpoint=rule.endpoint,
-                            verb=verb,
-                            prefix_ids=prefix_ids
-                        )
-                    for definition in defs:
-                        if 'id' not in definition:
-                            definitions.update(definition)
-                            continue
-                        def_id = definition.pop('id')
-                        if def_id is not None:
-                            definitions[def_id].update(definition)
-
-                operation = {}
-                if swag.get('summary'):
-                    operation['summary'] = swag.get('summary')
-                if swag.get('description'):
-                    operation['description'] = swag.get('description')
-                if request_body:
-                    operation['requestBody'] = request_body
-                if callbacks:
-                    operation['callbacks'] = callbacks
-                if responses:
-                    operation['responses'] = responses
-                # parameters - swagger ui dislikes empty parameter lists
-                if len(params) > 0:
-                    operation['parameters'] = params
-                # other optionals
-                for key in optional_fields:
-                    if key in swag:
-                        value = swag.get(key)
-                        if key in ('produces', 'consumes'):
-                            if not isinstance(value, (list, tuple)):
-                                value = [value]
-
-                        operation[key] = value
-                operations[verb] = operation
+        prefix = data.get('swaggerUiPrefix') or ''
+        base_path = data.get('basePath')
+        for rule in rules:
+            _, operations, definition_updates = self.rule_operations[rule_cache_key(rule)]
+            # the cached updates are shared between builds, copy instead of updating in place
+            for def_id, definition in definition_updates:
+                if def_id is None:
+                    definitions.update(definition)
+                else:
+                    definitions[def_id] = dict(definitions.get(def_id) or {}, **definition)
 
             if len(operations):
-                prefix = data.get('swaggerUiPrefix') or ''
-                srule = '{0}{1}'.format(prefix, rule)
-                # handle basePath
-                base_path = data.get('basePath')
-
-                if base_path:
-                    if base_path.endswith('/'):
-                        base_path = base_path[:-1]
-                    if base_path:
-                        # suppress base_path from srule if needed.
-                        # Otherwise we will get definitions twice...
-                        if srule.startswith(base_path):
-                            srule = srule[len(base_path):]
-
-                # old regex '(<(.*?\:)?(.*?)>)'
-                for arg in re.findall('(<([^<>]*:)?([^<>]*)>)', srule):
-                    srule = srule.replace(arg[0], '{%s}' % arg[2])
-
+                srule = rule_to_path(str(rule), prefix, base_path)
                 for key, val in operations.items():
                     if srule not in paths:
                         paths[srule] = {}
-                    if key in paths[srule]:
-                        paths[srule][key].update(val)
-                    else:
-                        paths[srule][key] = val
-        self.apispecs[endpoint] = data
+                    operation = dict(paths[srule].get(key) or {})
+                    operation.update(val)
+                    paths[srule][key] = operation
+
+        if is_openapi3() and definitions:
+            # the nested schemas referenced by swagger_decorator live in components/schemas in OAS3
+            components = dict(data.get('components') or {})
+            components['schemas'] = dict(components.get('schemas') or {}, **data.pop('definitions'))
+            data['components'] = components
+            data = replace_refs(data, '#/definitions/', '#/components/schemas/')
+        self.apispecs[spec['endpoint']] = data
         return data
@@ -1,3 +1,6 @@
+import functools
+import threading
+from collections.abc import Mapping
 from marshmallow import fields
 import marshmallow
 
@@ -23,7 +26,10 @@ FIELDS_JSON_TYPE_MAP = {
     fields.Bool: 'boolean',
     fields.Int: 'number',
 }
-if int(marshmallow.__version__.split('.')[0]) == 3:
+# parsed once at import, the version is checked on the request path
+MARSHMALLOW_V3 = int(marshmallow.__version__.split('.')[0]) == 3
+
+if MARSHMALLOW_V3:
     FIELDS_JSON_TYPE_MAP.update({
         fields.NaiveDateTime: 'string',
         fields.AwareDateTime: 'string',
@@ -39,27 +45,95 @@ PYTHON_TYPE_JSON_TYPE_MAP = {
 }
 
 
+@functools.lru_cache(maxsize=None)
+def resolve_json_type(field_class):
+    """
+    JSON type of a marshmallow field class: the one of the closest class of its MRO found
+    in FIELDS_JSON_TYPE_MAP, so custom field subclasses get the type of their parent.
+    None for unsupported fields. Cached per field class, call `resolve_json_type.cache_clear()`
+    after extending FIELDS_JSON_TYPE_MAP.
+    """
+    for klass in field_class.__mro__:
+        if klass in FIELDS_JSON_TYPE_MAP:
+            return FIELDS_JSON_TYPE_MAP[klass]
+    return None
+
+
 def convert_field_to_json_type(field):
     """
     Convert a Marshmallow field to its corresponding JSON type for Swagger.
     """
-    base_type = type(field)
-    return FIELDS_JSON_TYPE_MAP.get(base_type, 'string')
+    return resolve_json_type(type(field)) or 'string'
 
 
 def is_marsh_v3():
-    return int(marshmallow.__version__.split('.')[0]) == 3
+    return MARSHMALLOW_V3
 
 
-def data_schema(schema, data):
-    data = schema().load(data or {})
-    if not is_marsh_v3():
-        data = schema().dump(data.data).data
-    else:
-        data = schema().dump(data)
+def schema_instance_getter(schema):
+    """
+    Return a callable giving a reusable instance of `schema`.
+    Marshmallow 3 schemas keep no per-call state and are shared by every thread,
+    marshmallow 2 ones do (the unmarshaller errors), so those are kept per thread.
+    """
+    if MARSHMALLOW_V3:
+        instance = schema()
+        return lambda: instance
+
+    local = threading.local()
+
+    def get_instance():
+        instance = getattr(local, 'instance', None)
+        if instance is None:
+            instance = local.instance = schema()
+        return instance
+
+    return get_instance
+
+
+def data_schema(schema, data, load_only=False):
+    """
+    Validate `data` and return it serialized again by the same schema.
+    With `load_only` the loaded data is returned as is, skipping the dump round-trip.
+    """
+    if isinstance(schema, type):
+        schema = schema()
+    data = schema.load(data or {})
+    if not MARSHMALLOW_V3:
+        data = data.data
+    if load_only:
+        return data
+    return dump_schema(schema, data)
+
+
+def dump_schema(schema, data):
+    """Serialize already trusted python objects (e.g. a view result) without validating them"""
+    if isinstance(schema, type):
+        schema = schema()
+    data = schema.dump(data)
+    if not MARSHMALLOW_V3:
+        data = data.data
     return data
 
 
+def flatten_messages(messages, path='_schema'):
+    """
+    Yield (field path, text) of ValidationError messages, the nested ones (Nested fields,
+    bulk items by index) under a dotted path, e.g. ('1.name', 'Missing data for required field.')
+    """
+    if isinstance(messages, dict):
+        for key, value in messages.items():
+            yield from flatten_messages(value, key if path == '_schema' else '%s.%s' % (path, key))
+    elif isinstance(messages, (list, tuple)):
+        yield path, ''.join(str(message) for message in messages)
+    else:
+        yield path, str(messages)
+
+
+def format_messages(messages):
+    return ''.join('%s: %s; ' % item for item in flatten_messages(messages))
+
+
 def unpack(value):
     """Return a three tuple of data, code, and headers"""
     if not isinstance(value, tuple):
@@ -78,3 +152,58 @@ def unpack(value):
         pass
 
     return value, 200, {}
+
+
+def iter_repr(content, limit):
+    """Yield the str() of `content` piece by piece, long strings cut after `limit` characters"""
+    if isinstance(content, Mapping):
+        yield '{'
+        for index, (key, value) in enumerate(content.items()):
+            if index:
+                yield ', '
+            yield repr(key)
+            yield ': '
+            yield from iter_repr(value, limit)
+        yield '}'
+    elif isinstance(content, (list, tuple)):
+        yield '[' if isinstance(content, list) else '('
+        for index, value in enumerate(content):
+            if index:
+                yield ', '
+            yield from iter_repr(value, limit)
+        yield ']' if isinstance(content, list) else ')'
+    elif isinstance(content, (str, bytes)):
+        yield repr(content[:limit + 1])
+    else:
+        yield repr(content)
+
+
+def truncate_repr(content, max_length):
+    """
+    Render `content` up to `max_length` characters, stopping as soon as the limit is reached
+    instead of rendering the whole payload.
+    """
+    if isinstance(content, str):
+        return content if len(content) <= max_length else content[:max_length] + '...'
+    chunks, length = [], 0
+    for chunk in iter_repr(content, max_length):
+        chunks.append(chunk)
+        length += len(chunk)
+        if length > max_length:
+            return ''.join(chunks)[:max_length] + '...'
+    return ''.join(chunks)
+
+
+class LazyLogFormat(object):
+    """Log argument rendering `content` only when the record is actually emitted"""
+
+    __slots__ = ('content', 'max_length')
+
+    def __init__(self, content, max_length=None):
+        self.content = content
+        self.max_length = max_length
+
+    def __str__(self):
+        if not self.max_length:
+            return str(self.content)
+        return truncate_repr(self.content, self.max_length)
@@ -0,0 +1,103 @@
+import gzip
+import json
+import os
+from wsgiref.validate import validator
+
+import pytest
+from flask import Flask
+from marshmallow import Schema, fields
+
+from flasgger_marshmallow import Swagger, swagger_decorator
+from flasgger_marshmallow.artifacts import MANIFEST_NAME
+
+
+class UserSchema(Schema):
+    name = fields.Str(required=True)
+
+
+class AddressSchema(Schema):
+    city = fields.Str()
+
+
+def make_app(config=None, extra_route=False):
+    app = Flask(__name__)
+    Swagger(app, config=dict(Swagger.DEFAULT_CONFIG, **(config or {})))
+
+    @app.route('/users', methods=['POST'])
+    @swagger_decorator(json_schema=UserSchema, yaml_doc=False)
+    def create_user():
+        return {}, 200
+
+    if extra_route:
+        @app.route('/addresses', methods=['POST'])
+        @swagger_decorator(json_schema=AddressSchema, yaml_doc=False)
+        def create_address():
+            return {}, 200
+
+    return app
+
+
+def prebuild(app, directory):
+    result = app.test_cli_runner().invoke(args=['swagger-prebuild', '--output', str(directory)])
+    assert result.exit_code == 0, result.output
+    return result.output.split()
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_prebuild_writes_the_artifacts(tmp_path):
+    written = prebuild(make_app(), tmp_path)
+    assert sorted(os.path.basename(path) for path in written) == [
+        'apispec_1.json', 'apispec_1.json.gz', MANIFEST_NAME]
+    body = read(tmp_path / 'apispec_1.json')
+    assert gzip.decompress(read(tmp_path / 'apispec_1.json.gz')) == body
+    assert '/users' in json.loads(body)['paths']
+    manifest = json.loads(read(tmp_path / MANIFEST_NAME))
+    assert set(manifest['specs']['apispec_1']) == {'fingerprint', 'etag'}
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+
+
+@pytest.mark.parametrize('use_mmap', [False, True], ids=['read', 'mmap'])
+def test_artifacts_are_served(tmp_path, use_mmap):
+    prebuild(make_app(), tmp_path)
+    app = make_app({'apispec_artifacts': str(tmp_path), 'apispec_artifacts_mmap': use_mmap})
+    # asserts the WSGI compliance of the responses, bytes bodies included
+    app.wsgi_app = validator(app.wsgi_app)
+    client = app.test_client()
+    assert client.get('/apispec_1.json').get_data() == read(tmp_path / 'apispec_1.json')
+    gzipped = client.get('/apispec_1.json', headers={'Accept-Encoding': 'gzip'})
+    assert gzipped.get_data() == read(tmp_path / 'apispec_1.json.gz')
+    assert app.swag.prebuilt_apispecs['apispec_1'] is not None
+
+
+def test_out_of_date_artifacts_are_rebuilt(tmp_path):
+    prebuild(make_app(), tmp_path)
+    app = make_app({'apispec_artifacts': str(tmp_path)}, extra_route=True)
+    assert '/addresses' in json.loads(app.test_client().get('/apispec_1.json').get_data())['paths']
+    assert app.swag.prebuilt_apispecs['apispec_1'] is None
+
+
+def test_unchecked_artifacts_are_served_as_is(tmp_path):
+    prebuild(make_app(), tmp_path)
+    app = make_app({'apispec_artifacts': str(tmp_path), 'apispec_artifacts_check': False}, extra_route=True)
+    assert '/addresses' not in json.loads(app.test_client().get('/apispec_1.json').get_data())['paths']
+
+
+def test_prebuild_ignores_the_artifacts_it_replaces(tmp_path):
+    prebuild(make_app(), tmp_path)
+    app = make_app({'apispec_artifacts': str(tmp_path), 'apispec_artifacts_check': False}, extra_route=True)
+    prebuild(app, tmp_path)
+    assert '/addresses' in json.loads(read(tmp_path / 'apispec_1.json'))['paths']
+    served = make_app({'apispec_artifacts': str(tmp_path)}, extra_route=True)
+    served.test_client().get('/apispec_1.json')
+    assert served.swag.prebuilt_apispecs['apispec_1'] is not None
+
+
+def test_debug_ignores_the_artifacts(tmp_path):
+    prebuild(make_app(), tmp_path)
+    app = make_app({'apispec_artifacts': str(tmp_path), 'apispec_artifacts_check': False}, extra_route=True)
+    app.debug = True
+    assert '/addresses' in json.loads(app.test_client().get('/apispec_1.json').get_data())['paths']
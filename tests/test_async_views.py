@@ -0,0 +1,94 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from flask import Flask, request
+from marshmallow import Schema, fields
+
+from flasgger_marshmallow import swagger_decorator
+
+pytest.importorskip('asgiref')
+
+
+class PathSchema(Schema):
+    username = fields.Str(required=True)
+
+
+class QuerySchema(Schema):
+    age = fields.Int(required=True)
+
+
+class UserSchema(Schema):
+    username = fields.Str(required=True)
+    age = fields.Int(required=True)
+
+
+executor = ThreadPoolExecutor(2)
+
+VARIANTS = {
+    'sync': (False, None),
+    'async': (True, None),
+    'async with executor': (True, executor),
+}
+
+
+def get_user():
+    if request.query_schema['age'] < 0:
+        # an invalid response
+        return {'username': request.path_schema['username']}, 200
+    return {'username': request.path_schema['username'], 'age': request.query_schema['age']}, 200
+
+
+def make_client(variant):
+    is_async, validation_executor = VARIANTS[variant]
+    app = Flask(__name__)
+    decorator = swagger_decorator(
+        path_schema=PathSchema, query_schema=QuerySchema, response_schema={200: UserSchema},
+        validation_executor=validation_executor, yaml_doc=False)
+    if is_async:
+        async def view(username):
+            return get_user()
+    else:
+        def view(username):
+            return get_user()
+    app.add_url_rule('/users/<username>', 'get_user', decorator(view))
+    return app.test_client()
+
+
+def outputs(client):
+    return [
+        (response.status_code, response.get_data(as_text=True))
+        for response in (
+            client.get('/users/bob?age=3'),
+            client.get('/users/bob?age=x'),
+            client.get('/users/bob?age=-1'),
+        )
+    ]
+
+
+@pytest.mark.parametrize('variant', ['async', 'async with executor'])
+def test_async_views_answer_like_sync_views(variant):
+    assert outputs(make_client(variant)) == outputs(make_client('sync'))
+
+
+@pytest.mark.parametrize('variant', list(VARIANTS))
+def test_outputs(variant):
+    ok, request_error, response_error = outputs(make_client(variant))
+    assert ok[0] == 200 and '"age":3' in ok[1].replace(' ', '')
+    assert request_error == (400, 'request error: age: Not a valid integer.; ')
+    assert response_error == (400, 'response error: age: Missing data for required field.; ')
+
+
+@pytest.mark.parametrize('variant', ['async', 'async with executor'])
+def test_request_locations_are_set_in_async_views(variant):
+    seen = {}
+    app = Flask(__name__)
+
+    @app.route('/users/<username>')
+    @swagger_decorator(path_schema=PathSchema, query_schema=QuerySchema,
+                       validation_executor=VARIANTS[variant][1], yaml_doc=False)
+    async def view(username):
+        seen.update(path=request.path_schema, query=request.query_schema, json=request.json_schema)
+        return {}, 200
+
+    assert app.test_client().get('/users/bob?age=3').status_code == 200
+    assert seen == {'path': {'username': 'bob'}, 'query': {'age': 3}, 'json': None}
@@ -0,0 +1,59 @@
+import json
+
+from flask import Flask, request
+from marshmallow import Schema, fields
+
+from flasgger_marshmallow import swagger_decorator
+from flasgger_marshmallow.bulk import bulk_load
+from flasgger_marshmallow.utils import format_messages
+
+
+class ItemSchema(Schema):
+    name = fields.Str(required=True)
+    age = fields.Int()
+
+
+def make_client(**options):
+    app = Flask(__name__)
+
+    @app.route('/items', methods=['POST'])
+    @swagger_decorator(json_schema=ItemSchema, bulk=True, yaml_doc=False, **options)
+    def create_items():
+        return {'items': request.json_schema, 'errors': {str(k): v for k, v in request.json_errors.items()}}, 200
+
+    return app.test_client()
+
+
+def test_invalid_items_are_reported_by_index():
+    body = [{'name': 'a'}, {'age': 'x'}, {'name': 'c', 'age': 3}]
+    response = make_client(bulk_chunk_size=2).post('/items', json=body)
+    assert response.status_code == 200
+    assert json.loads(response.get_data()) == {
+        'items': [{'name': 'a'}, {'name': 'c', 'age': 3}],
+        'errors': {'1': {'name': ['Missing data for required field.'], 'age': ['Not a valid integer.']}},
+    }
+
+
+def test_fail_fast_answers_the_item_messages():
+    response = make_client(bulk_fail_fast=True).post('/items', json=[{'name': 'a'}, {}])
+    assert response.status_code == 400
+    assert response.get_data(as_text=True) == 'request error: 1.name: Missing data for required field.; '
+
+
+def test_items_that_are_not_objects_are_rejected():
+    result = bulk_load(ItemSchema, [0, '', [], None, {'name': 'a'}])
+    assert result.items == [{'name': 'a'}]
+    assert sorted(result.errors) == [0, 1, 2, 3]
+    assert result.errors[0] == {'_schema': ['Invalid input type.']}
+
+
+def test_body_that_is_not_an_array_is_rejected():
+    response = make_client().post('/items', json={'name': 'a'})
+    assert response.status_code == 400
+    assert response.get_data(as_text=True) == 'request error: _schema: Invalid input type.; '
+
+
+def test_format_messages():
+    assert format_messages({'name': ['Missing.', 'Short.'], 'mobile': {'no': ['Bad.']}}) == (
+        'name: Missing.Short.; mobile.no: Bad.; ')
+    assert format_messages(['Invalid.']) == '_schema: Invalid.; '
@@ -0,0 +1,163 @@
+import json
+
+from flask import Flask, request
+from marshmallow import Schema, fields
+
+from flasgger_marshmallow import LRUBackend, ResponseCache, swagger_decorator
+from flasgger_marshmallow import cache as cache_module
+
+
+class PathSchema(Schema):
+    username = fields.Str(required=True)
+
+
+class QuerySchema(Schema):
+    lang = fields.Str(load_default='en')
+
+
+class UserSchema(Schema):
+    username = fields.Str()
+    lang = fields.Str()
+    calls = fields.Int()
+
+
+def make_app(cache):
+    app = Flask(__name__)
+    app.calls = 0
+
+    @swagger_decorator(path_schema=PathSchema, query_schema=QuerySchema, response_schema={200: UserSchema},
+                       cache=cache, yaml_doc=False)
+    def get_user(username):
+        app.calls += 1
+        if request.path_schema['username'] == 'missing':
+            return 'not found', 404
+        return {'username': username, 'lang': request.query_schema['lang'], 'calls': app.calls}, 200
+
+    app.add_url_rule('/users/<username>', 'get_user', get_user, methods=['GET', 'POST'])
+    app.view = get_user
+    return app
+
+
+def get(client, url, **kwargs):
+    response = client.get(url, **kwargs)
+    return response.status_code, json.loads(response.get_data()) if response.status_code == 200 else None
+
+
+def test_hits_skip_the_view():
+    cache = ResponseCache()
+    app = make_app(cache)
+    client = app.test_client()
+    assert get(client, '/users/bob') == (200, {'username': 'bob', 'lang': 'en', 'calls': 1})
+    assert get(client, '/users/bob') == (200, {'username': 'bob', 'lang': 'en', 'calls': 1})
+    assert get(client, '/users/bob?lang=fr')[1]['calls'] == 2
+    assert get(client, '/users/alice')[1]['calls'] == 3
+    assert (cache.hits, cache.misses) == (1, 3)
+    assert app.calls == 3
+
+
+def test_only_gets_are_cached():
+    cache = ResponseCache()
+    app = make_app(cache)
+    client = app.test_client()
+    client.post('/users/bob')
+    client.post('/users/bob')
+    assert app.calls == 2
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_errors_are_not_stored():
+    cache = ResponseCache()
+    app = make_app(cache)
+    client = app.test_client()
+    assert client.get('/users/missing').status_code == 404
+    assert client.get('/users/missing').status_code == 404
+    assert app.calls == 2
+    assert cache.hits == 0
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, 'monotonic', lambda: now[0])
+    cache = ResponseCache(ttl=5)
+    app = make_app(cache)
+    client = app.test_client()
+    get(client, '/users/bob')
+    now[0] += 4.9
+    assert get(client, '/users/bob')[1]['calls'] == 1
+    now[0] += 0.2
+    assert get(client, '/users/bob')[1]['calls'] == 2
+
+
+def test_least_recently_used_entries_are_evicted():
+    backend = LRUBackend(max_size=2)
+    backend.set('a', 1, 60)
+    backend.set('b', 2, 60)
+    assert backend.get('a') == 1
+    backend.set('c', 3, 60)
+    assert (backend.get('a'), backend.get('b'), backend.get('c')) == (1, None, 3)
+
+
+def test_vary_headers_are_in_the_key():
+    cache = ResponseCache(vary_headers=('Accept-Language',))
+    app = make_app(cache)
+    client = app.test_client()
+    get(client, '/users/bob', headers={'Accept-Language': 'fr'})
+    assert get(client, '/users/bob', headers={'Accept-Language': 'fr'})[1]['calls'] == 1
+    assert get(client, '/users/bob', headers={'Accept-Language': 'de'})[1]['calls'] == 2
+    assert get(client, '/users/bob')[1]['calls'] == 3
+
+
+def test_invalidate_one_entry():
+    cache = ResponseCache()
+    app = make_app(cache)
+    client = app.test_client()
+    get(client, '/users/bob')
+    get(client, '/users/alice')
+    cache.invalidate(app.view, path_schema={'username': 'bob'}, query_schema={'lang': 'en'},
+                     view_args={'username': 'bob'})
+    assert get(client, '/users/bob')[1]['calls'] == 3
+    assert get(client, '/users/alice')[1]['calls'] == 2
+
+
+def test_invalidate_every_entry_of_a_view():
+    cache = ResponseCache()
+    app = make_app(cache)
+    client = app.test_client()
+    get(client, '/users/bob')
+    get(client, '/users/alice')
+    cache.invalidate(app.view)
+    assert get(client, '/users/bob')[1]['calls'] == 3
+    assert get(client, '/users/alice')[1]['calls'] == 4
+    cache.clear()
+    assert get(client, '/users/alice')[1]['calls'] == 5
+
+
+def make_detail_view(module, kind):
+    def detail(id):
+        return {'kind': kind, 'id': id}, 200
+
+    # same-named views of two modules
+    detail.__module__ = module
+    detail.__qualname__ = 'detail'
+    return detail
+
+
+def test_same_named_views_of_different_modules_do_not_share_entries():
+    cache = ResponseCache()
+    app = Flask(__name__)
+    users = swagger_decorator(cache=cache, yaml_doc=False)(make_detail_view('app.users', 'user'))
+    orders = swagger_decorator(cache=cache, yaml_doc=False)(make_detail_view('app.orders', 'order'))
+    app.add_url_rule('/users/<int:id>', 'users', users)
+    app.add_url_rule('/orders/<int:id>', 'orders', orders)
+    client = app.test_client()
+    assert get(client, '/users/1')[1] == {'kind': 'user', 'id': 1}
+    assert get(client, '/orders/1')[1] == {'kind': 'order', 'id': 1}
+    assert get(client, '/orders/1')[1] == {'kind': 'order', 'id': 1}
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    cache.invalidate(orders)
+    assert get(client, '/users/1')[1] == {'kind': 'user', 'id': 1}
+    assert (cache.hits, cache.misses) == (2, 2)
+    cache.invalidate('app.users.detail')
+    assert get(client, '/users/1')[1] == {'kind': 'user', 'id': 1}
+    assert (cache.hits, cache.misses) == (2, 3)
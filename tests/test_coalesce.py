@@ -0,0 +1,136 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from flask import Flask, request
+from marshmallow import Schema, fields
+
+from flasgger_marshmallow import swagger_decorator
+from flasgger_marshmallow.coalesce import SingleFlight
+
+# requests started together
+BURST = 5
+
+
+class QuerySchema(Schema):
+    q = fields.Str(required=True)
+
+
+class ResultSchema(Schema):
+    q = fields.Str()
+    calls = fields.Int()
+
+
+def burst(client, urls):
+    """(status, body) of the GET requests of `urls`, sent together from threads"""
+    responses = [None] * len(urls)
+
+    def get(index):
+        response = client.get(urls[index])
+        responses[index] = response.status_code, response.get_data(as_text=True)
+
+    threads = [threading.Thread(target=get, args=(index,)) for index in range(len(urls))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    return responses
+
+
+class ItemSchema(Schema):
+    q = fields.Str()
+
+
+class ItemsSchema(Schema):
+    items = fields.Nested(ItemSchema, many=True)
+
+
+def make_client(is_async=False, stream=False):
+    app = Flask(__name__)
+    app.calls = 0
+    arrived = threading.Semaphore(0)
+    first = threading.Lock()
+
+    @app.before_request
+    def count_arrival():
+        arrived.release()
+
+    def run(q):
+        # the first call waits for the whole burst to reach the view
+        if first.acquire(blocking=False):
+            for _ in range(BURST):
+                arrived.acquire(timeout=5)
+            time.sleep(0.2)
+        app.calls += 1
+        if q == 'boom':
+            raise RuntimeError('boom')
+        if stream:
+            return {'items': iter([{'q': q}])}, 200
+        return {'q': q, 'calls': app.calls}, 200
+
+    if stream:
+        decorator = swagger_decorator(
+            query_schema=QuerySchema, response_schema={200: ItemsSchema}, stream_field='items', coalesce=True,
+            yaml_doc=False)
+    else:
+        decorator = swagger_decorator(
+            query_schema=QuerySchema, response_schema={200: ResultSchema}, coalesce=True, yaml_doc=False)
+    if is_async:
+        async def view():
+            return await asyncio.get_running_loop().run_in_executor(None, run, request.query_schema['q'])
+    else:
+        def view():
+            return run(request.query_schema['q'])
+    app.add_url_rule('/search', 'search', decorator(view))
+    return app, app.test_client()
+
+
+@pytest.mark.parametrize('is_async', [False, True], ids=['sync', 'async'])
+def test_identical_requests_share_one_call(is_async):
+    if is_async:
+        pytest.importorskip('asgiref')
+    app, client = make_client(is_async)
+    responses = burst(client, ['/search?q=a'] * BURST)
+    assert app.calls == 1
+    assert [(status, json.loads(body)) for status, body in responses] == [(200, {'q': 'a', 'calls': 1})] * BURST
+
+
+def test_distinct_requests_are_not_coalesced():
+    app, client = make_client()
+    responses = burst(client, ['/search?q=%d' % index for index in range(BURST)])
+    assert app.calls == BURST
+    assert sorted(json.loads(body)['q'] for _, body in responses) == [str(index) for index in range(BURST)]
+
+
+def test_exceptions_are_shared():
+    app, client = make_client()
+    responses = burst(client, ['/search?q=boom'] * BURST)
+    assert app.calls == 1
+    assert [status for status, _ in responses] == [500] * BURST
+
+
+def test_response_objects_are_not_shared():
+    app, client = make_client(stream=True)
+    responses = burst(client, ['/search?q=a'] * BURST)
+    assert app.calls == BURST
+    assert [(status, json.loads(body)) for status, body in responses] == [(200, {'items': [{'q': 'a'}]})] * BURST
+
+
+def test_followers_do_not_hold_executor_threads():
+    flight = SingleFlight()
+
+    async def lead():
+        # runs once the followers joined, on the single thread of the loop executor
+        await asyncio.sleep(0.05)
+        return await asyncio.get_running_loop().run_in_executor(None, lambda: 'result')
+
+    async def main():
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(1))
+        return await asyncio.wait_for(
+            asyncio.gather(*[flight.do_async('key', lead) for _ in range(BURST)]), 5)
+
+    assert sorted(asyncio.run(main())) == [('result', False)] + [('result', True)] * (BURST - 1)
+    assert flight.calls == {}
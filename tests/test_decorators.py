@@ -0,0 +1,147 @@
+import json
+
+from flask import Flask, request
+from marshmallow import EXCLUDE, RAISE, Schema, fields
+
+from flasgger_marshmallow import RESPONSE_VALIDATION_FAILURES, swagger_decorator
+from flasgger_marshmallow.decorators import declared_keys
+
+
+class UserSchema(Schema):
+    name = fields.Str()
+    age = fields.Int()
+
+
+def make_client(**options):
+    app = Flask(__name__)
+
+    @app.route('/user')
+    @swagger_decorator(response_schema={200: UserSchema}, yaml_doc=False, **options)
+    def get_user():
+        return {'name': 'bob', 'age': 'not a number'}, 200
+
+    return app.test_client()
+
+
+def test_dump_failure_answers_response_error_without_validation():
+    response = make_client(response_validation='never').get('/user')
+    assert response.status_code == 400
+    assert response.get_data(as_text=True).startswith('response error: ')
+
+
+def test_dump_failure_answers_response_error_with_load_only():
+    response = make_client(load_only=True).get('/user')
+    assert response.status_code == 400
+    assert response.get_data(as_text=True).startswith('response error: ')
+
+
+def test_sampled_failure_is_recorded_then_the_dump_failure_answered():
+    key = '%s.make_client.<locals>.get_user' % __name__
+    before = RESPONSE_VALIDATION_FAILURES[key]
+    response = make_client(response_validation='sampled', response_sample_rate=1).get('/user')
+    assert response.status_code == 400
+    assert response.get_data(as_text=True).startswith('response error: ')
+    assert RESPONSE_VALIDATION_FAILURES[key] == before + 1
+
+
+def test_validation_failure_answers_its_messages():
+    response = make_client(response_validation='always').get('/user')
+    assert response.status_code == 400
+    assert response.get_data(as_text=True) == 'response error: age: Not a valid integer.; '
+
+
+class FormSchema(Schema):
+    name = fields.Str()
+
+
+def test_werkzeug_http_errors_are_not_request_errors():
+    app = Flask(__name__)
+    app.config['MAX_CONTENT_LENGTH'] = 10
+
+    @app.route('/users', methods=['POST'])
+    @swagger_decorator(form_schema=FormSchema, yaml_doc=False)
+    def create_user():
+        return {}, 200
+
+    response = app.test_client().post('/users', data={'name': 'a name longer than the limit'})
+    assert response.status_code == 413
+
+
+class TokenHeadersSchema(Schema):
+    class Meta:
+        unknown = EXCLUDE
+
+    token = fields.Str(required=True, data_key='X-Token')
+
+
+def test_lowercase_header_matches_its_data_key():
+    app = Flask(__name__)
+
+    @app.route('/me')
+    @swagger_decorator(headers_schema=TokenHeadersSchema, yaml_doc=False)
+    def get_me():
+        # dumped again under its data_key
+        return {'token': request.headers_schema['X-Token']}, 200
+
+    response = app.test_client().get('/me', headers={'x-token': 'secret'})
+    assert response.status_code == 200
+    assert json.loads(response.get_data()) == {'token': 'secret'}
+
+
+class ExcludeQuerySchema(Schema):
+    class Meta:
+        unknown = EXCLUDE
+
+    name = fields.Str()
+    page = fields.Int(data_key='p')
+
+
+class RaiseQuerySchema(Schema):
+    class Meta:
+        unknown = RAISE
+
+    name = fields.Str()
+
+
+def test_only_the_keys_of_exclude_schemas_are_extracted():
+    assert declared_keys(ExcludeQuerySchema()) == ('name', 'p')
+    assert declared_keys(RaiseQuerySchema()) is None
+
+
+def make_query_client(query_schema):
+    app = Flask(__name__)
+
+    @app.route('/users')
+    @swagger_decorator(query_schema=query_schema, yaml_doc=False)
+    def list_users():
+        return dict(request.query_schema), 200
+
+    return app.test_client()
+
+
+def test_exclude_schema_ignores_the_other_query_keys():
+    response = make_query_client(ExcludeQuerySchema).get('/users?name=bob&p=2&sort=age')
+    assert response.status_code == 200
+    assert json.loads(response.get_data()) == {'name': 'bob', 'p': 2}
+
+
+def test_raise_schema_rejects_the_other_query_keys():
+    client = make_query_client(RaiseQuerySchema)
+    assert client.get('/users?name=bob').status_code == 200
+    response = client.get('/users?name=bob&sort=age')
+    assert response.status_code == 400
+    assert response.get_data(as_text=True) == 'request error: sort: Unknown field.; '
+
+
+def test_undeclared_form_body_is_left_unread():
+    app = Flask(__name__)
+
+    @app.route('/users', methods=['POST'])
+    @swagger_decorator(query_schema=ExcludeQuerySchema, yaml_doc=False)
+    def create_user():
+        # the body is still in the stream, it was not parsed as a form
+        return {'body': request.get_data(as_text=True)}, 200
+
+    response = app.test_client().post('/users?name=bob', data={'name': 'alice'})
+    assert response.status_code == 200
+    assert json.loads(response.get_data()) == {'body': 'name=alice'}
@@ -0,0 +1,175 @@
+import enum
+
+import pytest
+from marshmallow import EXCLUDE, INCLUDE, RAISE
+from marshmallow import Schema
+from marshmallow import ValidationError
+from marshmallow import fields
+from marshmallow import pre_load
+from marshmallow import validate
+from marshmallow import validates
+from marshmallow import validates_schema
+
+from flasgger_marshmallow.fast_validators import compile_schema
+from flasgger_marshmallow.fast_validators import is_flat_schema
+from flasgger_marshmallow.fast_validators import load_default
+from flasgger_marshmallow.utils import data_schema
+
+
+class Color(enum.Enum):
+    red = 1
+    blue = 2
+
+
+class DefaultsSchema(Schema):
+    name = fields.String(required=True)
+    page = fields.Integer(load_default=1, dump_default=0)
+    size = fields.Integer(required=False, validate=validate.Range(max=100))
+    ratio = fields.Float(required=False, allow_none=True)
+    active = fields.Boolean(required=False)
+    color = fields.Enum(Color, required=False)
+
+
+class KeysSchema(Schema):
+    credential = fields.String(required=True, data_key='Login-Credential')
+    name = fields.String(attribute='username', required=False)
+    agent = fields.String(data_key='User-Agent', load_default=lambda: 'unknown')
+    code = fields.String(required=False, dump_only=True)
+    secret = fields.String(required=False, load_only=True)
+
+
+def with_unknown(schema, unknown):
+    return type('%s%s' % (schema.__name__, unknown.title()), (schema,), {'Meta': type('Meta', (), {'unknown': unknown})})
+
+
+SCHEMAS = [
+    with_unknown(schema, unknown)
+    for schema in (DefaultsSchema, KeysSchema)
+    for unknown in (EXCLUDE, INCLUDE, RAISE)
+]
+
+PAYLOADS = [
+    {},
+    {'name': 'bob'},
+    {'name': 'bob', 'page': '3', 'size': 20, 'ratio': None, 'active': 'true', 'color': 'red'},
+    {'name': 1, 'page': 'x', 'size': 1000, 'ratio': 'y', 'active': 'maybe', 'color': 'green'},
+    {'name': None, 'extra': 1, 'other': [1]},
+    {'Login-Credential': 'token', 'User-Agent': 'curl', 'name': 'bob', 'secret': 's', 'code': 'c'},
+    {'Login-Credential': 3, 'username': 'bob', 'extra': 'x'},
+    {'credential': 'token'},
+]
+
+NON_MAPPINGS = [[1, 2], 'payload', 42, (('name', 'bob'),)]
+
+
+def load_outcome(load, data):
+    try:
+        return 'ok', load(data)
+    except ValidationError as error:
+        return 'error', error.messages, error.valid_data
+
+
+@pytest.mark.parametrize('schema', SCHEMAS, ids=lambda schema: schema.__name__)
+@pytest.mark.parametrize('data', PAYLOADS + NON_MAPPINGS)
+def test_load_matches_schema_load(schema, data):
+    instance = schema()
+    compiled = compile_schema(instance)
+    assert compiled is not None
+    assert load_outcome(compiled.load, data) == load_outcome(instance.load, data)
+
+
+@pytest.mark.parametrize('schema', SCHEMAS, ids=lambda schema: schema.__name__)
+@pytest.mark.parametrize('data', [None, {}])
+def test_load_of_empty_data_matches_data_schema(schema, data):
+    instance = schema()
+    compiled = compile_schema(instance)
+    assert load_outcome(compiled.load, data) == load_outcome(
+        lambda data: data_schema(instance, data, load_only=True), data)
+
+
+@pytest.mark.parametrize('schema', SCHEMAS, ids=lambda schema: schema.__name__)
+@pytest.mark.parametrize('obj', [
+    {},
+    {'name': 'bob', 'page': 3, 'size': 20, 'ratio': 0.5, 'active': True, 'color': Color.blue},
+    {'name': 'bob', 'ratio': None, 'extra': 1},
+    {'credential': 'token', 'username': 'bob', 'agent': 'curl', 'code': 'c', 'secret': 's'},
+])
+def test_dump_matches_schema_dump(schema, obj):
+    instance = schema()
+    assert compile_schema(instance).dump(obj) == instance.dump(obj)
+
+
+def test_dump_reads_object_attributes():
+    class User(object):
+        credential = 'token'
+        username = 'bob'
+        code = 'c'
+
+    instance = KeysSchema()
+    assert compile_schema(instance).dump(User()) == instance.dump(User())
+
+
+class PreLoadSchema(Schema):
+    name = fields.String()
+
+    @pre_load
+    def strip(self, data, **kwargs):
+        return data
+
+
+class SchemaValidatorSchema(Schema):
+    name = fields.String()
+
+    @validates_schema
+    def check(self, data, **kwargs):
+        pass
+
+
+class FieldValidatorSchema(Schema):
+    name = fields.String()
+
+    @validates('name')
+    def check_name(self, value, **kwargs):
+        pass
+
+
+class HandleErrorSchema(Schema):
+    name = fields.String()
+
+    def handle_error(self, error, data, **kwargs):
+        raise ValueError(error.messages)
+
+
+class NestedSchema(Schema):
+    user = fields.Nested(DefaultsSchema)
+
+
+class ListSchema(Schema):
+    names = fields.List(fields.String())
+
+
+class DottedAttributeSchema(Schema):
+    name = fields.String(attribute='user.name')
+
+
+@pytest.mark.parametrize('schema', [
+    PreLoadSchema(), SchemaValidatorSchema(), FieldValidatorSchema(), HandleErrorSchema(),
+    NestedSchema(), ListSchema(), DottedAttributeSchema(), DefaultsSchema(many=True), DefaultsSchema(partial=True),
+], ids=lambda schema: '%s%s' % (type(schema).__name__, '(many)' if schema.many else '(partial)' if schema.partial else ''))
+def test_schemas_changing_load_are_not_flat(schema):
+    assert not is_flat_schema(schema)
+    assert compile_schema(schema) is None
+
+
+def test_flat_schemas():
+    assert is_flat_schema(DefaultsSchema())
+    assert is_flat_schema(KeysSchema())
+
+
+def test_load_default_before_marshmallow_3_13():
+    class OldField(object):
+        # marshmallow < 3.13 fields only have `missing`
+        missing = 1
+
+    assert load_default(OldField()) == 1
+    assert load_default(fields.Integer(load_default=2)) == 2
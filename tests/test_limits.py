@@ -0,0 +1,88 @@
+import pytest
+from flask import Flask
+from marshmallow import Schema, fields
+
+from flasgger_marshmallow import swagger_decorator
+from flasgger_marshmallow.limits import RequestLimitError, scan_json, schema_depth
+
+
+class ChildSchema(Schema):
+    name = fields.Str()
+    born = fields.Date()
+
+
+class ParentSchema(Schema):
+    name = fields.Str()
+    age = fields.Int()
+    children = fields.Nested(ChildSchema, many=True)
+    tags = fields.List(fields.Str())
+
+
+class TupleSchema(Schema):
+    point = fields.Tuple((fields.Int(), fields.List(fields.Int())))
+
+
+class CustomField(fields.Field):
+    pass
+
+
+class CustomSchema(Schema):
+    value = CustomField()
+
+
+class FunctionSchema(Schema):
+    value = fields.Function(deserialize=lambda value: value)
+
+
+class RecursiveSchema(Schema):
+    child = fields.Nested(lambda: RecursiveSchema())
+
+
+def test_schema_depth():
+    assert schema_depth(ChildSchema) == 1
+    assert schema_depth(ParentSchema) == 3
+    assert schema_depth(TupleSchema) == 3
+
+
+@pytest.mark.parametrize('schema', [CustomSchema, FunctionSchema, RecursiveSchema])
+def test_schemas_of_unbounded_depth(schema):
+    assert schema_depth(schema) is None
+
+
+def test_scan_json():
+    scan_json(b'{"a": [1, [2, "[[[,,,"]]}', max_depth=3, max_array_length=2)
+    with pytest.raises(RequestLimitError):
+        scan_json(b'{"a": [[[1]]]}', max_depth=3)
+    with pytest.raises(RequestLimitError):
+        scan_json(b'[1, 2, 3]', max_array_length=2)
+
+
+@pytest.mark.parametrize('schema, body', [
+    (TupleSchema, {'point': [1, [2, 3]]}),
+    (CustomSchema, {'value': {'nested': [{'a': 1}]}}),
+    (FunctionSchema, {'value': [[1], {'a': {}}]}),
+])
+def test_schema_depth_accepts_nested_data_of_any_field(schema, body):
+    app = Flask(__name__)
+
+    @app.route('/', methods=['POST'])
+    @swagger_decorator(json_schema=schema, max_json_depth='schema', yaml_doc=False)
+    def create():
+        return {}, 200
+
+    assert app.test_client().post('/', json=body).status_code == 200
+
+
+def test_body_limits():
+    app = Flask(__name__)
+
+    @app.route('/', methods=['POST'])
+    @swagger_decorator(json_schema=ParentSchema, max_json_depth='schema', max_body_bytes=100, yaml_doc=False)
+    def create():
+        return {}, 200
+
+    client = app.test_client()
+    assert client.post('/', json={'children': [{'name': 'a'}]}).status_code == 200
+    response = client.post('/', json={'children': [{'name': {'a': [1]}}]})
+    assert (response.status_code, response.get_data(as_text=True)) == (400, 'request error: json nested deeper than 3')
+    assert client.post('/', json={'name': 'x' * 100}).status_code == 413
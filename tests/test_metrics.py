@@ -0,0 +1,78 @@
+from flask import Flask
+from marshmallow import Schema, fields
+
+from flasgger_marshmallow import HistogramMetrics, MetricsHook, swagger_decorator
+
+
+class UserSchema(Schema):
+    name = fields.Str(required=True)
+
+
+def make_client(metrics, **options):
+    app = Flask(__name__)
+
+    @app.route('/users', methods=['POST'])
+    @swagger_decorator(json_schema=UserSchema, metrics=metrics, yaml_doc=False, **options)
+    def create_user():
+        return {}, 200
+
+    return app.test_client()
+
+
+ENDPOINT = '%s.make_client.<locals>.create_user' % __name__
+
+
+def test_phases_and_errors_are_measured():
+    metrics = HistogramMetrics()
+    client = make_client(metrics)
+    assert client.post('/users', json={'name': 'bob'}).status_code == 200
+    assert client.post('/users', json={}).status_code == 400
+    phases = {phase: histogram[2] for (_, phase), histogram in metrics.histograms.items()}
+    assert phases == {'extract': 2, 'json_schema': 2, 'handler': 1, 'response': 1}
+    assert dict(metrics.errors) == {(ENDPOINT, 'json_schema'): 1}
+
+
+def test_limit_rejections_are_counted():
+    metrics = HistogramMetrics()
+    client = make_client(metrics, max_body_bytes=10, max_json_depth='schema')
+    assert client.post('/users', json={'name': 'a long enough name'}).status_code == 413
+    assert client.post('/users', json={'name': [[1, 2, 3]]}).status_code == 413
+    client = make_client(metrics, max_json_depth='schema')
+    assert client.post('/users', json={'name': [1]}).status_code == 400
+    assert dict(metrics.errors) == {(ENDPOINT, 'json_schema'): 3}
+
+
+def test_partial_hooks_are_optional():
+    class ErrorsOnly(MetricsHook):
+        def __init__(self):
+            self.errors = []
+
+        def count_error(self, endpoint, location):
+            self.errors.append(location)
+
+    metrics = ErrorsOnly()
+    client = make_client(metrics)
+    assert client.post('/users', json={'name': 'bob'}).status_code == 200
+    assert client.post('/users', json={}).status_code == 400
+    assert metrics.errors == ['json_schema']
+    assert make_client(MetricsHook()).post('/users', json={'name': 'bob'}).status_code == 200
+
+
+def test_same_named_views_of_different_modules_have_their_own_series():
+    metrics = HistogramMetrics()
+    app = Flask(__name__)
+    for module in ('app.users', 'app.orders'):
+        def create():
+            return {}, 200
+
+        # same-named views of two modules
+        create.__module__ = module
+        create.__qualname__ = 'create'
+        view = swagger_decorator(json_schema=UserSchema, metrics=metrics, yaml_doc=False)(create)
+        app.add_url_rule('/%s' % module, module, view, methods=['POST'])
+    client = app.test_client()
+    assert client.post('/app.users', json={}).status_code == 400
+    assert client.post('/app.orders', json={}).status_code == 400
+    assert client.post('/app.orders', json={}).status_code == 400
+    assert dict(metrics.errors) == {('app.users.create', 'json_schema'): 1, ('app.orders.create', 'json_schema'): 2}
+    assert {endpoint for endpoint, _ in metrics.histograms} == {'app.users.create', 'app.orders.create'}
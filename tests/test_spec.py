@@ -0,0 +1,218 @@
+import json
+import os
+
+import pytest
+from flask import Flask
+from marshmallow import Schema, fields
+
+from flasgger_marshmallow import Swagger, swagger_decorator
+
+# the apispec of make_app() built by the baseline flasgger_marshmallow, before the registry
+BASELINE_APISPEC = os.path.join(os.path.dirname(__file__), 'baseline_apispec.json')
+
+
+class MobileSchema(Schema):
+    model = fields.String(required=True, metadata={'doc': 'model'})
+    no = fields.String(required=True)
+
+
+class UserSchema(Schema):
+    username = fields.Str(required=True, metadata={'doc': 'login'})
+    age = fields.Integer(required=False, dump_default=0)
+    qq = fields.List(fields.String, required=False)
+    mobile = fields.Nested(MobileSchema, many=False)
+    mobiles = fields.Nested(MobileSchema, many=True)
+
+    class Meta:
+        unknown = 'exclude'
+
+
+class QuerySchema(Schema):
+    id = fields.Int(required=False)
+    username = fields.String(required=False, metadata={'doc': 'filter'})
+
+
+class UsersSchema(Schema):
+    users = fields.Nested(UserSchema, many=True)
+    count = fields.Integer(required=True)
+
+
+class HeadersSchema(Schema):
+    credential = fields.String(required=True, data_key='Login-Credential')
+
+    class Meta:
+        unknown = 'exclude'
+
+
+class PathSchema(Schema):
+    username = fields.String()
+
+
+class CreatedSchema(Schema):
+    id = fields.Integer(required=True)
+
+
+def make_app(config=None, **options):
+    app = Flask(__name__)
+    Swagger(app, config=dict(Swagger.DEFAULT_CONFIG, **config) if config else None)
+
+    @app.route('/users', methods=['POST'])
+    @swagger_decorator(json_schema=UserSchema, response_schema={200: CreatedSchema}, **options)
+    def create_user():
+        """Create a user"""
+        return {'id': 1}
+
+    @app.route('/users', methods=['GET'])
+    @swagger_decorator(query_schema=QuerySchema, headers_schema=HeadersSchema,
+                       response_schema={200: UsersSchema}, tags=['users'], **options)
+    def list_users():
+        """
+        List the users
+        Filtered by username
+        """
+        return {'count': 0, 'users': []}
+
+    @app.route('/users/<username>', methods=['GET'])
+    @swagger_decorator(path_schema=PathSchema, response_schema={200: UserSchema}, tags=['users'], **options)
+    def get_user(username):
+        return {'username': username}, 200
+
+    return app
+
+
+def get_apispec(app, endpoint='apispec_1'):
+    return json.loads(app.test_client().get('/%s.json' % endpoint).get_data())
+
+
+def without_docs(apispec):
+    """`apispec` without the summaries and descriptions of its operations, parsed from the docstrings"""
+    for operations in apispec['paths'].values():
+        for operation in operations.values():
+            operation.pop('summary', None)
+            operation.pop('description', None)
+    return apispec
+
+
+def test_inline_apispec_matches_the_baseline():
+    with open(BASELINE_APISPEC) as f:
+        baseline = json.load(f)
+    assert without_docs(get_apispec(make_app(nested_refs=False))) == without_docs(baseline)
+
+
+def test_registry_builds_the_operations():
+    apispec = get_apispec(make_app(yaml_doc=False))
+    assert sorted(apispec['paths']) == ['/users', '/users/{username}']
+    list_users = apispec['paths']['/users']['get']
+    assert list_users['summary'] == 'List the users'
+    assert list_users['description'] == 'Filtered by username'
+    assert list_users['tags'] == ['users']
+    assert [(p['in'], p['name']) for p in list_users['parameters']] == [
+        ('query', 'id'), ('query', 'username'), ('header', 'Login-Credential')]
+    assert apispec['paths']['/users']['post']['summary'] == 'Create a user'
+    path_parameter = apispec['paths']['/users/{username}']['get']['parameters'][0]
+    assert (path_parameter['in'], path_parameter['name'], path_parameter['required']) == ('path', 'username', True)
+
+
+def test_nested_schemas_are_referenced_from_the_definitions():
+    apispec = get_apispec(make_app(yaml_doc=False))
+    assert sorted(apispec['definitions']) == ['MobileSchema', 'UserSchema']
+    user = apispec['definitions']['UserSchema']['properties']
+    assert user['mobile']['allOf'] == [{'$ref': '#/definitions/MobileSchema'}]
+    assert user['mobiles']['items'] == {'$ref': '#/definitions/MobileSchema'}
+    users = apispec['paths']['/users']['get']['responses']['200']['schema']['properties']['users']
+    assert users['items'] == {'$ref': '#/definitions/UserSchema'}
+
+
+def test_openapi3_references_the_components():
+    apispec = get_apispec(make_app({'openapi': '3.0.2'}, yaml_doc=False))
+    assert 'definitions' not in apispec
+    assert sorted(apispec['components']['schemas']) == ['MobileSchema', 'UserSchema']
+    assert '#/definitions/' not in json.dumps(apispec)
+    # the OAS3 rewriting leaves the shared compiled fragments untouched
+    assert '#/components/' not in json.dumps(get_apispec(make_app(yaml_doc=False)))
+
+
+class TreeSchema(Schema):
+    name = fields.Str()
+    children = fields.Nested(lambda: TreeSchema(), many=True)
+
+
+def test_recursive_schemas_are_referenced_inline():
+    app = Flask(__name__)
+    Swagger(app)
+
+    @app.route('/trees', methods=['POST'])
+    @swagger_decorator(json_schema=TreeSchema, nested_refs=False, yaml_doc=False)
+    def create_tree():
+        return {}, 200
+
+    apispec = get_apispec(app)
+    tree = apispec['definitions']['TreeSchema']
+    assert tree['properties']['children']['items'] == {'$ref': '#/definitions/TreeSchema'}
+    body = apispec['paths']['/trees']['post']['parameters'][0]['schema']
+    assert body['properties']['children']['items'] == {'$ref': '#/definitions/TreeSchema'}
+
+
+def test_debug_rebuilds_after_a_view_changes():
+    app = make_app(yaml_doc=False)
+    app.debug = True
+    client = app.test_client()
+    before = json.loads(client.get('/apispec_1.json').get_data())
+    assert before['paths']['/users/{username}']['get']['tags'] == ['users']
+
+    @swagger_decorator(path_schema=PathSchema, response_schema={200: UserSchema}, tags=['admin'], yaml_doc=False)
+    def get_user(username):
+        return {'username': username}, 200
+
+    app.view_functions['get_user'] = get_user
+    after = json.loads(client.get('/apispec_1.json').get_data())
+    assert after['paths']['/users/{username}']['get']['tags'] == ['admin']
+    assert after['paths']['/users'] == before['paths']['/users']
+
+
+def test_apispec_cache_dir_round_trip(tmp_path):
+    config = {'apispec_cache_dir': str(tmp_path)}
+    body = make_app(config, yaml_doc=False).test_client().get('/apispec_1.json').get_data()
+    assert sorted(os.listdir(tmp_path))[0].startswith('apispec_1-')
+
+    app = make_app(config, yaml_doc=False)
+    assert app.test_client().get('/apispec_1.json').get_data() == body
+    assert app.swag.prebuilt_apispecs['apispec_1'] is not None
+
+    # another route, another fingerprint: the cached spec isn't used
+    app = make_app(config, yaml_doc=False)
+
+    @app.route('/other')
+    @swagger_decorator(query_schema=QuerySchema, yaml_doc=False)
+    def other():
+        return {}, 200
+
+    assert '/other' in get_apispec(app)['paths']
+    assert app.swag.prebuilt_apispecs['apispec_1'] is None
+
+
+SPECS = [
+    {'endpoint': 'public', 'route': '/public.json', 'rule_filter': lambda rule: rule.rule.startswith('/users/')},
+    {'endpoint': 'internal', 'route': '/internal.json', 'rule_filter': lambda rule: rule.rule.startswith('/users')},
+]
+
+
+@pytest.mark.parametrize('openapi', [None, '3.0.2'])
+def test_build_apispecs_matches_the_single_builds(openapi):
+    config = {'specs': SPECS}
+    if openapi:
+        config['openapi'] = openapi
+    app = make_app(config, yaml_doc=False)
+    with app.app_context():
+        built = json.loads(json.dumps(app.swag.build_apispecs(max_workers=2)))
+    single = make_app(config, yaml_doc=False)
+    assert built == {spec['endpoint']: get_apispec(single, spec['endpoint']) for spec in SPECS}
+    assert sorted(built['public']['paths']) == ['/users/{username}']
+    assert sorted(built['internal']['paths']) == ['/users', '/users/{username}']
+
+
+if __name__ == '__main__':
+    # regenerate BASELINE_APISPEC, with the baseline package first on sys.path
+    with open(BASELINE_APISPEC, 'w') as f:
+        json.dump(get_apispec(make_app()), f, indent=2, sort_keys=True)
+        f.write('\n')
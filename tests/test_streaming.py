@@ -0,0 +1,80 @@
+import json
+
+from flask import Flask
+from marshmallow import Schema, fields
+
+from flasgger_marshmallow import RESPONSE_VALIDATION_FAILURES, swagger_decorator
+
+
+class UserSchema(Schema):
+    username = fields.Str(required=True)
+    age = fields.Int()
+
+
+class UsersSchema(Schema):
+    count = fields.Int()
+    users = fields.Nested(UserSchema, many=True)
+
+
+class Users(object):
+
+    def __init__(self, users):
+        self.count = len(users)
+        self.users = iter(users)
+
+
+def make_client(result):
+    app = Flask(__name__)
+
+    @app.route('/users')
+    @swagger_decorator(response_schema={200: UsersSchema}, stream_field='users', yaml_doc=False)
+    def list_users():
+        return result(), 200
+
+    return app.test_client()
+
+
+def test_items_are_streamed():
+    users = [{'username': 'u%d' % i, 'age': i} for i in range(5)]
+    response = make_client(lambda: {'count': 5, 'users': iter(users)}).get('/users')
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert json.loads(response.get_data()) == {'count': 5, 'users': users}
+
+
+def test_invalid_first_item_answers_response_error():
+    response = make_client(lambda: {'count': 1, 'users': iter([{'age': 1}])}).get('/users')
+    assert response.status_code == 400
+    assert response.get_data(as_text=True).startswith('response error: ')
+
+
+def test_later_invalid_items_are_recorded_and_dumped():
+    key = '%s.make_client.<locals>.list_users' % __name__
+    before = RESPONSE_VALIDATION_FAILURES[key]
+    users = [{'username': 'a', 'age': 1}, {'username': 'b'}, {'age': 3}]
+    response = make_client(lambda: {'count': 3, 'users': iter(users)}).get('/users')
+    assert response.status_code == 200
+    assert json.loads(response.get_data()) == {'count': 3, 'users': users}
+    assert RESPONSE_VALIDATION_FAILURES[key] == before + 1
+
+
+def test_later_items_failing_their_dump_are_written_as_null():
+    users = [{'username': 'a', 'age': 1}, {'username': 'b', 'age': 2}, {'username': 'c', 'age': 'x'}]
+    response = make_client(lambda: {'count': 3, 'users': iter(users)}).get('/users')
+    assert response.status_code == 200
+    assert json.loads(response.get_data()) == {'count': 3, 'users': users[:2] + [None]}
+
+
+def test_object_results_are_streamed():
+    users = [{'username': 'u%d' % i, 'age': i} for i in range(3)]
+    app = Flask(__name__)
+
+    @app.route('/users')
+    @swagger_decorator(response_schema={200: UsersSchema}, stream_field='users', response_validation='never',
+                       yaml_doc=False)
+    def list_users():
+        return Users(users), 200
+
+    response = app.test_client().get('/users')
+    assert response.status_code == 200
+    assert json.loads(response.get_data()) == {'count': 3, 'users': users}
@@ -0,0 +1,45 @@
+import gzip
+import json
+
+from flask import Flask
+from marshmallow import Schema, fields
+
+from flasgger_marshmallow import Swagger, swagger_decorator
+
+
+class UserSchema(Schema):
+    name = fields.Str(required=True)
+    age = fields.Int()
+
+
+def make_app(config=None):
+    app = Flask(__name__)
+    Swagger(app, config=dict(Swagger.DEFAULT_CONFIG, **(config or {})))
+
+    @app.route('/users', methods=['POST'])
+    @swagger_decorator(json_schema=UserSchema, response_schema={200: UserSchema}, yaml_doc=False)
+    def create_user():
+        return {}, 200
+
+    return app
+
+
+def test_apispec_is_gzipped_when_accepted():
+    client = make_app().test_client()
+    response = client.get('/apispec_1.json', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert '/users' in json.loads(gzip.decompress(response.get_data()))['paths']
+    for accept_encoding in ('gzip;q=0', 'identity', ''):
+        response = client.get('/apispec_1.json', headers={'Accept-Encoding': accept_encoding})
+        assert 'Content-Encoding' not in response.headers
+        assert '/users' in json.loads(response.get_data())['paths']
+
+
+def test_apispec_etag_answers_not_modified():
+    client = make_app().test_client()
+    response = client.get('/apispec_1.json')
+    etag = response.headers['ETag']
+    assert client.get('/apispec_1.json', headers={'If-None-Match': etag}).status_code == 304
+    gzipped = client.get('/apispec_1.json', headers={'Accept-Encoding': 'gzip'})
+    assert gzipped.headers['ETag'] != etag
+    assert client.get('/apispec_1.json', headers={'If-None-Match': 'other'}).status_code == 200